@@ -0,0 +1,115 @@
+"""
+Compara create_supabase_client() por requisição com o cliente assíncrono compartilhado,
+contra um servidor HTTP local que faz o papel da API REST do Supabase.
+
+Uso, a partir de src/backend:
+    python -m benchmarks.bench_db_client [--requests 300] [--concurrency 10] [--delay-ms 2]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from database.supabase import create_pooled_supabase_client
+from supabase import create_client
+
+API_KEY = "header.payload.signature"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+    connections = set()
+
+    def _reply(self):
+        StandInHandler.connections.add(self.client_address)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.delay)
+        body = json.dumps([{"id": 1, "username": "bench", "password": "x"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def summary(name, latencies, connections):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    print(f"{name:>26}: média={statistics.mean(latencies):7.2f} ms  p50={statistics.median(latencies):7.2f} ms  "
+          f"p99={p99:7.2f} ms  conexões TCP={connections}")
+
+
+def bench_per_request(url, requests):
+    StandInHandler.connections.clear()
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        supabase = create_client(url, API_KEY)
+        supabase.table("users").select("*").eq("username", "bench").execute()
+        latencies.append((time.perf_counter() - start) * 1000)
+    summary("cliente por requisição", latencies, len(StandInHandler.connections))
+
+
+async def bench_pooled(url, requests, concurrency):
+    StandInHandler.connections.clear()
+    supabase = await create_pooled_supabase_client(url, API_KEY)
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        await supabase.table("users").select("*").eq("username", "bench").execute()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    for _ in range(requests):
+        await one()
+    summary("pool (sequencial)", latencies, len(StandInHandler.connections))
+
+    latencies.clear()
+    StandInHandler.connections.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await one()
+
+    await asyncio.gather(*[limited() for _ in range(requests)])
+    summary(f"pool ({concurrency} concorrentes)", latencies, len(StandInHandler.connections))
+    await supabase.postgrest.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    StandInHandler.delay = args.delay_ms / 1000
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    bench_per_request(url, args.requests)
+    asyncio.run(bench_pooled(url, args.requests, args.concurrency))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Tamanho do forecast_result antes (lista de {date, predicted_value}) e depois
+(formato compacto de utils/forecast_codec), por linha gravada e por resposta.
+
+O tamanho em JSON é o que a coluna `json` guarda e o que trafega nas listagens.
+
+Uso, a partir de src/backend:
+    python -m benchmarks.bench_forecast_codec [--rows 100]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.forecast_codec import encode_forecast, expand_forecast
+
+
+def legacy_forecast(values, start):
+    return [
+        {"date": (start + timedelta(days=i)).strftime("%Y-%m-%d %H:%M:%S"), "predicted_value": float(value)}
+        for i, value in enumerate(values)
+    ]
+
+
+def size(obj):
+    return len(json.dumps(obj).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    start = datetime(2024, 10, 1, 17)
+    print(f"{'dias':>5} {'lista (B)':>10} {'compacto (B)':>13} {'redução':>8} {'página de 7 (B)':>16} {'expandir (µs)':>14}")
+    for days in (7, 30, 90, 365):
+        values = (2500 + rng.normal(0, 50, days)).astype(np.float32)
+        legacy = legacy_forecast(values, start)
+        compact = encode_forecast(values, start)
+
+        begin = time.perf_counter()
+        for _ in range(1000):
+            page = expand_forecast(compact, 0, 7)
+        expand_us = (time.perf_counter() - begin) * 1000
+
+        print(f"{days:>5} {size(legacy):>10} {size(compact):>13} {size(legacy) / size(compact):>7.1f}x "
+              f"{size(page):>16} {expand_us:>14.1f}")
+
+    values = (2500 + rng.normal(0, 50, 90)).astype(np.float32)
+    legacy_rows = [{"id": i, "forecast_result": legacy_forecast(values, start)} for i in range(args.rows)]
+    compact_rows = [{"id": i, "forecast_result": encode_forecast(values, start)} for i in range(args.rows)]
+    print(f"\nlistagem de {args.rows} predicts de 90 dias: lista={size(legacy_rows) / 1024:.1f} KiB  "
+          f"compacto={size(compact_rows) / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
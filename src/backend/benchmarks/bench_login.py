@@ -0,0 +1,90 @@
+"""
+Latência do login sob carga concorrente: bcrypt direto no event loop (como era)
+contra a verificação no pool de threads de utils/crypto.
+
+Cada login simulado espera a consulta ao banco (--db-ms) e verifica a senha.
+Uma sonda mede em paralelo o atraso do event loop, que representa qualquer
+outra requisição atendida pelo mesmo worker.
+
+Uso, a partir de src/backend:
+    python -m benchmarks.bench_login [--logins 64] [--concurrency 16] [--rounds 12] [--db-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def probe(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - start) * 1000 - 10)
+
+
+async def run(name, login, logins, concurrency):
+    latencies, lags = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await login()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    probe_task = asyncio.create_task(probe(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    print(f"{name:>14}: login p50={statistics.median(latencies):8.1f} ms  p99={percentile(latencies, 99):8.1f} ms  "
+          f"vazão={logins / elapsed:6.1f}/s  atraso do loop p99={percentile(lags, 99):8.1f} ms")
+
+
+async def main_async(args):
+    from utils.crypto import CRYPT_CONTEXT, HASH_WORKERS, verify_and_update, verify_password
+
+    stored = CRYPT_CONTEXT.hash("senha")
+    db_delay = args.db_ms / 1000
+
+    async def login_inline():
+        await asyncio.sleep(db_delay)
+        verify_password("senha", stored)
+
+    async def login_pool():
+        await asyncio.sleep(db_delay)
+        await verify_and_update("senha", stored)
+
+    print(f"bcrypt rounds={args.rounds}  HASH_WORKERS={HASH_WORKERS}  "
+          f"{args.logins} logins, {args.concurrency} concorrentes")
+    await run("no event loop", login_inline, args.logins, args.concurrency)
+    await run("pool", login_pool, args.logins, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--db-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # utils.crypto lê BCRYPT_ROUNDS na importação
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    # O benchmark não emite tokens, mas utils.crypto exige o segredo para importar
+    os.environ.setdefault("JWT_SECRET", "bench")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
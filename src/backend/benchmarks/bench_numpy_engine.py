@@ -0,0 +1,114 @@
+"""
+Compara o engine NumPy (utils/numpy_engine.py) com o Keras: tempo de import e
+carga, memória residente, latência de um passo com batch 1 e a diferença máxima
+entre as previsões. Cada engine roda num subprocesso próprio, para que a memória
+e o tempo de import de um não contaminem o outro.
+
+Uso, a partir de src/backend:
+    python -m benchmarks.bench_numpy_engine [--days 90] [--steps 500]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+TIME_STEPS = 60
+
+
+def rss_mib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def child(engine, name, days, steps):
+    rss_start = rss_mib()
+    start = time.perf_counter()
+    from utils.model_registry import ModelRegistry
+    from utils.price_series import get_price_series
+    from utils.rolling_forecast import get_stateful_step, get_step, rolling_forecast
+
+    registry = ModelRegistry(model_names=(name,), engine=engine)
+    model = registry.get(name)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    series = get_price_series(os.path.join("utils", "eth_historical_data.csv"), TIME_STEPS)
+    window = np.asarray(series.window, dtype=np.float32).reshape(1, TIME_STEPS, 1)
+
+    step = get_step(model)
+    step(window)
+    step_ms = best_ms(lambda: step(window), steps)
+
+    stateful = get_stateful_step(model)
+    value, states = stateful.prime(window.reshape(1, TIME_STEPS))
+    stateful_ms = best_ms(lambda: stateful(value, states), steps)
+
+    forecast_ms = best_ms(lambda: rolling_forecast(model, series.window, days), 3)
+    forecast = rolling_forecast(model, series.window, days)
+
+    print(json.dumps({
+        "load_ms": load_ms,
+        "rss_mib": rss_mib(),
+        "rss_delta_mib": rss_mib() - rss_start,
+        "tensorflow_imported": "tensorflow" in sys.modules,
+        "step_ms": step_ms,
+        "stateful_step_ms": stateful_ms,
+        "forecast_ms": forecast_ms,
+        "forecast": np.asarray(forecast, dtype=np.float64).reshape(-1).tolist(),
+    }))
+
+
+def run_child(engine, name, days, steps):
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_numpy_engine", "--child", engine, name,
+         "--days", str(days), "--steps", str(steps)],
+        capture_output=True, text=True, env=env, check=True,
+    ).stdout
+    # A última linha é o JSON; as anteriores são os prints do registry
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=["lstm", "gru"])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--child", nargs=2, metavar=("ENGINE", "MODEL"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.days, args.steps)
+        return
+
+    for name in args.models:
+        results = {engine: run_child(engine, name, args.days, args.steps) for engine in ("keras", "numpy")}
+        print(f"\n== {name} ({args.days} dias, batch 1)")
+        for engine, r in results.items():
+            print(
+                f"{engine:6s}: import+carga {r['load_ms']:8.1f} ms  RSS {r['rss_mib']:7.1f} MiB"
+                f" (+{r['rss_delta_mib']:6.1f})  passo {r['step_ms']:7.3f} ms"
+                f"  passo stateful {r['stateful_step_ms']:7.3f} ms  previsão {r['forecast_ms']:8.2f} ms"
+                f"  TF importado: {r['tensorflow_imported']}"
+            )
+        diff = np.abs(np.array(results["keras"]["forecast"]) - np.array(results["numpy"]["forecast"])).max()
+        print(f"diferença máxima (normalizado): {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
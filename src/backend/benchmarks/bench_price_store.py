@@ -0,0 +1,83 @@
+"""
+Compara a leitura do CSV com pd.read_csv e o price store mapeado em memória
+(utils/price_store.py) em séries sintéticas de vários tamanhos.
+
+Para cada tamanho mede:
+- read_csv: parse da coluna Close inteira (o que a inferência precisava a cada carga)
+- store tail: abrir o store e fatiar as últimas 60 linhas (sem cópia)
+- store fit: min/max da coluna inteira, como no ajuste inicial do scaler
+- convert: conversão única CSV -> store
+
+Uso, a partir de src/backend (100M linhas geram ~8 GB de CSV em --dir):
+    python -m benchmarks.bench_price_store [--rows 1000 1000000] [--dir /tmp]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.price_store import PriceStore, convert_csv
+
+GENERATE_CHUNK = 1_000_000
+TIME_STEPS = 60
+
+
+def generate_csv(path, rows):
+    rng = np.random.default_rng(0)
+    # Datas não decrescentes (o store só aceita anexar no fim) e dentro do limite do pandas
+    start = np.datetime64("1970-01-01")
+    with open(path, "w") as f:
+        f.write("Date,Open,High,Low,Close,Adj Close,Volume\n")
+        for begin in range(0, rows, GENERATE_CHUNK):
+            n = min(GENERATE_CHUNK, rows - begin)
+            close = 2000 + rng.normal(0, 50, n)
+            df = pd.DataFrame({
+                "Date": (start + np.arange(begin, begin + n) // 1000).astype(str),
+                "Open": close, "High": close + 5, "Low": close - 5, "Close": close, "Adj Close": close,
+                "Volume": rng.integers(1e9, 1e10, n),
+            })
+            df.to_csv(f, header=False, index=False, float_format="%.6f")
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(rows, directory):
+    csv_path = os.path.join(directory, f"bench_{rows}.csv")
+    store_path = os.path.join(directory, f"bench_{rows}.prices")
+    generate_csv(csv_path, rows)
+    repeat = 5 if rows <= 1_000_000 else 1
+
+    convert_ms, _ = timed(lambda: convert_csv(csv_path, store_path), 1)
+    csv_ms, csv_tail = timed(lambda: pd.read_csv(csv_path, usecols=["Close"])["Close"].to_numpy()[-TIME_STEPS:], repeat)
+    tail_ms, store_tail = timed(lambda: PriceStore(store_path).tail("close", TIME_STEPS), repeat)
+    fit_ms, _ = timed(lambda: (lambda c: (c.min(), c.max()))(PriceStore(store_path).column("close")), repeat)
+    assert np.allclose(csv_tail, store_tail)
+
+    print(f"{rows:>11,} linhas | CSV {os.path.getsize(csv_path) / 2**20:9.1f} MiB  "
+          f"store {os.path.getsize(store_path) / 2**20:9.1f} MiB | read_csv {csv_ms:10.2f} ms  "
+          f"store tail {tail_ms:7.3f} ms  store fit {fit_ms:9.2f} ms | convert {convert_ms:10.1f} ms")
+
+    os.remove(csv_path)
+    os.remove(store_path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 1_000_000])
+    parser.add_argument("--dir", default="/tmp")
+    args = parser.parse_args()
+    for rows in args.rows:
+        run(rows, args.dir)
+
+
+if __name__ == "__main__":
+    main()
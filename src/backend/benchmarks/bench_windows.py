@@ -0,0 +1,75 @@
+"""
+Compara o create_sequences antigo (loop em Python) com as views de utils/windows.py.
+
+Uso, a partir de src/backend:
+    python -m benchmarks.bench_windows [--rows 10000000] [--legacy-max-rows 1000000]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.windows import create_sequences, sliding_windows
+
+CSV_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "utils", "eth_historical_data.csv")
+
+
+def create_sequences_loop(data, time_steps=60):
+    X, y = [], []
+    for i in range(len(data) - time_steps):
+        X.append(data[i:i + time_steps, 0])
+        y.append(data[i + time_steps, 0])
+    return np.array(X), np.array(y)
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(name, data, legacy_max_rows):
+    rows = len(data)
+    print(f"\n== {name}: {rows} linhas")
+
+    if rows <= legacy_max_rows:
+        seconds, (X, y) = timed(create_sequences_loop, data, repeat=1 if rows > 100_000 else 3)
+        print(f"loop Python       : {seconds * 1000:10.2f} ms  ({(X.nbytes + y.nbytes) / 2**20:9.1f} MiB alocados)")
+    else:
+        estimate = (rows - 60) * 61 * data.itemsize / 2**20
+        print(f"loop Python       :   ignorado (alocaria ~{estimate:,.0f} MiB)")
+
+    seconds, (X, y) = timed(create_sequences, data)
+    print(f"create_sequences  : {seconds * 1000:10.4f} ms  (view {X.shape}, base compartilhada: {np.shares_memory(X, data)})")
+
+    seconds, windows = timed(sliding_windows, data, 60, 5)
+    print(f"stride=5          : {seconds * 1000:10.4f} ms  (view {windows.shape})")
+
+    # Custo de consumir um lote, como faria uma inferência em lote
+    batch = min(4096, len(X))
+    seconds, _ = timed(np.ascontiguousarray, X[-batch:], repeat=5)
+    print(f"materializar {batch:5d} : {seconds * 1000:10.4f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--legacy-max-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    closes = pd.read_csv(CSV_FILE_PATH)[["Close"]].dropna().to_numpy(dtype=np.float64)
+    run("eth_historical_data.csv", closes, args.legacy_max_rows)
+
+    rng = np.random.default_rng(0)
+    synthetic = np.cumsum(rng.standard_normal(args.rows)).reshape(-1, 1)
+    run("série sintética", synthetic, args.legacy_max_rows)
+
+
+if __name__ == "__main__":
+    main()
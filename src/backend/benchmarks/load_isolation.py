@@ -0,0 +1,75 @@
+"""
+Mede a latência de um endpoint leve enquanto previsões rodam em paralelo.
+
+Com a inferência no executor dedicado, a latência do endpoint sonda deve
+continuar próxima da medida com o servidor ocioso.
+
+Uso, com o backend rodando:
+    python -m benchmarks.load_isolation --url http://127.0.0.1:8000 --days 90 --concurrency 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def probe(client, path, duration, interval):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def forecast_loop(client, model, days, stop):
+    payload = {"username": "loadtest", "user_id": 0, "forecast": True, "forecast_result": "string", "days": days}
+    count = 0
+    while not stop.is_set():
+        await client.post(f"/predicts/predict/{model}", json=payload)
+        count += 1
+    return count
+
+
+def report(name, latencies):
+    print(f"{name:>18}: n={len(latencies):4d}  p50={statistics.median(latencies):8.2f} ms  "
+          f"p90={percentile(latencies, 90):8.2f} ms  p99={percentile(latencies, 99):8.2f} ms  max={max(latencies):8.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--model", default="lstm")
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--probe-path", default="/metrics/")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+        idle = await probe(client, args.probe_path, args.duration / 2, args.interval)
+        report("ocioso", idle)
+
+        stop = asyncio.Event()
+        workers = [asyncio.create_task(forecast_loop(client, args.model, args.days, stop))
+                   for _ in range(args.concurrency)]
+        loaded = await probe(client, args.probe_path, args.duration, args.interval)
+        stop.set()
+        forecasts = sum(await asyncio.gather(*workers))
+        report("com previsões", loaded)
+        print(f"{'previsões':>18}: {forecasts} concluídas com {args.concurrency} clientes de {args.days} dias")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
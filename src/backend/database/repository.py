@@ -0,0 +1,118 @@
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+TABLE_COLUMNS = {
+    "users": ("id", "username", "password"),
+    "predict": ("id", "username_predict", "date", "forecast", "forecast_result", "model", "user_id", "created_at"),
+    "logs": ("id", "date", "username_log", "action", "user_id", "created_at"),
+}
+
+# Colunas que a API pode devolver; o hash da senha nunca sai do banco
+PUBLIC_COLUMNS = {
+    **TABLE_COLUMNS,
+    "users": ("id", "username"),
+}
+
+def select_columns(table: str, fields: str = None):
+    """
+    Converte `fields=a,b` numa projeção válida para a tabela.
+    O id sempre vem junto porque é o cursor da paginação.
+    """
+    if not fields:
+        return "*" if PUBLIC_COLUMNS[table] == TABLE_COLUMNS[table] else ",".join(PUBLIC_COLUMNS[table])
+
+    allowed = PUBLIC_COLUMNS[table]
+    columns = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [column for column in columns if column not in allowed]
+    if unknown:
+        raise ValueError(f"Campos inválidos para {table}: {', '.join(unknown)}")
+
+    if "id" not in columns:
+        columns.insert(0, "id")
+    return ",".join(columns)
+
+def column_list(table: str, fields: str = None):
+    # Mesma validação de select_columns, mas como lista (cabeçalho do CSV)
+    selected = select_columns(table, fields)
+    return list(PUBLIC_COLUMNS[table]) if selected == "*" else selected.split(",")
+
+def apply_filters(query, filters: dict = None, date_from=None, date_to=None):
+    for column, value in (filters or {}).items():
+        if value is not None:
+            query = query.eq(column, value)
+    if date_from is not None:
+        query = query.gte("created_at", date_from.isoformat())
+    if date_to is not None:
+        query = query.lt("created_at", date_to.isoformat())
+    return query
+
+async def list_page(supabase, table: str, limit: int = DEFAULT_PAGE_LIMIT, cursor: int = None,
+                    fields: str = None, filters: dict = None, date_from=None, date_to=None,
+                    descending: bool = True):
+    """
+    Paginação por keyset em `id`: a próxima página começa depois do último id
+    retornado, sem OFFSET. Retorna (linhas, próximo cursor ou None).
+    Com filtro de user_id, o ORDER BY id é atendido pelo índice (user_id, id)
+    (migrations/002); o intervalo de created_at é filtrado nessa varredura.
+    """
+    query = supabase.table(table).select(select_columns(table, fields))
+    query = apply_filters(query, filters, date_from, date_to)
+
+    if cursor is not None:
+        query = query.lt("id", cursor) if descending else query.gt("id", cursor)
+
+    # Um registro a mais indica se existe próxima página
+    response = await query.order("id", desc=descending).limit(limit + 1).execute()
+    rows = response.data
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]["id"]
+    return rows, next_cursor
+
+async def latest(supabase, table: str, fields: str = None, filters: dict = None):
+    # ORDER BY id DESC LIMIT 1 usa o índice da chave primária, sem varrer a tabela
+    query = supabase.table(table).select(select_columns(table, fields))
+    query = apply_filters(query, filters)
+    response = await query.order("id", desc=True).limit(1).execute()
+    return response.data[0] if response.data else None
+
+async def iter_pages(supabase, table: str, page_size: int = MAX_PAGE_LIMIT, cursor: int = None,
+                     fields: str = None, filters: dict = None, date_from=None, date_to=None):
+    """
+    Percorre a tabela inteira em ordem crescente de id, uma página por vez.
+    Só uma página fica em memória; `cursor` retoma depois do último id exportado.
+    """
+    while True:
+        rows, cursor = await list_page(supabase, table, limit=page_size, cursor=cursor, fields=fields,
+                                       filters=filters, date_from=date_from, date_to=date_to,
+                                       descending=False)
+        if rows:
+            yield rows
+        if cursor is None:
+            return
+
+async def update_rows(supabase, table: str, values: dict, ids: list):
+    """
+    UPDATE ... WHERE id IN (...) numa única ida ao banco; o PostgREST devolve as
+    linhas alteradas, então lista vazia significa que nenhum id existia.
+    """
+    response = await supabase.table(table).update(values).in_("id", ids).execute()
+    return response.data
+
+async def delete_rows(supabase, table: str, ids: list):
+    response = await supabase.table(table).delete().in_("id", ids).execute()
+    return response.data
+
+async def update_by_id(supabase, table: str, row_id: int, values: dict):
+    response = await supabase.table(table).update(values).eq("id", row_id).execute()
+    return response.data[0] if response.data else None
+
+async def delete_by_id(supabase, table: str, row_id: int):
+    response = await supabase.table(table).delete().eq("id", row_id).execute()
+    return response.data[0] if response.data else None
+
+def missing_ids(ids: list, rows: list):
+    found = {row["id"] for row in rows}
+    return [row_id for row_id in ids if row_id not in found]
@@ -0,0 +1,287 @@
+"""
+Acesso direto ao banco (asyncpg ou SQLite) com a mesma interface encadeada do
+cliente Supabase: table().select().eq().order().limit() e await execute(),
+que devolve um objeto com `.data`. Assim routers e database/repository.py
+funcionam igual com DB_BACKEND=supabase, postgres ou sqlite.
+
+No Postgres cada forma de consulta gera sempre o mesmo texto SQL com parâmetros
+($1, $2...; listas viram `= ANY($n)`), então o asyncpg prepara a consulta uma vez
+por conexão e reaproveita o statement do cache nas chamadas seguintes (login,
+insert de predict/logs, páginas das listagens).
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+from database.repository import TABLE_COLUMNS
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))
+
+JSON_COLUMNS = {"forecast_result"}
+TIMESTAMP_COLUMNS = {"created_at"}
+BOOLEAN_COLUMNS = {"forecast"}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id integer PRIMARY KEY AUTOINCREMENT,
+    username text UNIQUE,
+    password text
+);
+CREATE TABLE IF NOT EXISTS predict (
+    id integer PRIMARY KEY AUTOINCREMENT,
+    username_predict text,
+    date text,
+    forecast bool,
+    forecast_result text,
+    model text,
+    user_id integer REFERENCES users (id),
+    created_at text NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE TABLE IF NOT EXISTS logs (
+    id integer PRIMARY KEY AUTOINCREMENT,
+    date text,
+    username_log text,
+    action text,
+    user_id integer REFERENCES users (id),
+    created_at text NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS predict_user_id_created_at_idx ON predict (user_id, created_at);
+CREATE INDEX IF NOT EXISTS logs_user_id_created_at_idx ON logs (user_id, created_at);
+CREATE INDEX IF NOT EXISTS predict_user_id_id_idx ON predict (user_id, id);
+CREATE INDEX IF NOT EXISTS logs_user_id_id_idx ON logs (user_id, id);
+"""
+
+
+class SqlResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class QueryBuilder:
+    def __init__(self, client, table: str):
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f"Tabela desconhecida: {table}")
+        self.client = client
+        self.table = table
+        self._action = "select"
+        self._columns = "*"
+        self._values = None
+        self._where = []
+        self._order = None
+        self._limit = None
+
+    def _column(self, name: str):
+        # Os nomes entram no texto do SQL: só colunas conhecidas da tabela
+        name = name.strip()
+        if name not in TABLE_COLUMNS[self.table]:
+            raise ValueError(f"Coluna desconhecida em {self.table}: {name}")
+        return name
+
+    def select(self, columns: str = "*", **kwargs):
+        self._action = "select"
+        if columns.strip() != "*":
+            self._columns = ", ".join(self._column(column) for column in columns.split(","))
+        return self
+
+    def insert(self, rows, **kwargs):
+        self._action = "insert"
+        self._values = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values: dict, **kwargs):
+        self._action = "update"
+        self._values = values
+        return self
+
+    def delete(self, **kwargs):
+        self._action = "delete"
+        return self
+
+    def _filter(self, column, op, value):
+        self._where.append((self._column(column), op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def order(self, column, desc: bool = False, **kwargs):
+        self._order = (self._column(column), desc)
+        return self
+
+    def limit(self, size: int, **kwargs):
+        self._limit = int(size)
+        return self
+
+    def _build(self):
+        params = []
+
+        def param(column, value):
+            params.append(self.client.encode(column, value))
+            return self.client.placeholder(len(params))
+
+        if self._action == "insert":
+            columns = [self._column(column) for column in self._values[0]]
+            rows = ", ".join(
+                "(" + ", ".join(param(column, row.get(column)) for column in columns) + ")"
+                for row in self._values
+            )
+            return f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES {rows} RETURNING *", params
+
+        if self._action == "update":
+            assignments = ", ".join(f"{self._column(column)} = {param(column, value)}"
+                                    for column, value in self._values.items())
+            sql = f"UPDATE {self.table} SET {assignments}"
+        elif self._action == "delete":
+            sql = f"DELETE FROM {self.table}"
+        else:
+            sql = f"SELECT {self._columns} FROM {self.table}"
+
+        conditions = []
+        for column, op, value in self._where:
+            if op == "in":
+                conditions.append(self.client.in_condition(column, value, param))
+            else:
+                conditions.append(f"{column} {op} {param(column, value)}")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        if self._action != "select":
+            return sql + " RETURNING *", params
+
+        if self._order is not None:
+            sql += f" ORDER BY {self._order[0]} {'DESC' if self._order[1] else 'ASC'}"
+        if self._limit is not None:
+            sql += f" LIMIT {param(None, self._limit)}"
+        return sql, params
+
+    async def execute(self):
+        sql, params = self._build()
+        rows = await self.client.fetch(sql, params)
+        return SqlResponse([self.client.decode(row) for row in rows])
+
+
+class SqlClient:
+    def table(self, name: str):
+        return QueryBuilder(self, name)
+
+    def encode(self, column, value):
+        if column in JSON_COLUMNS and value is not None:
+            return json.dumps(value)
+        return value
+
+    def decode(self, row):
+        row = dict(row)
+        for column, value in row.items():
+            if column in JSON_COLUMNS and isinstance(value, str):
+                row[column] = json.loads(value)
+            elif isinstance(value, datetime):
+                row[column] = value.isoformat()
+        return row
+
+
+class PostgresClient(SqlClient):
+    def __init__(self, pool):
+        self.pool = pool
+
+    def placeholder(self, index: int):
+        return f"${index}"
+
+    def in_condition(self, column, values, param):
+        # Um único parâmetro array: o mesmo statement preparado serve para qualquer tamanho de lista
+        return f"{column} = ANY({param(None, values)})"
+
+    def encode(self, column, value):
+        # O asyncpg exige datetime para timestamptz; sem fuso, vale UTC como no PostgREST
+        if column in TIMESTAMP_COLUMNS and value is not None:
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value
+        return super().encode(column, value)
+
+    async def fetch(self, sql, params):
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql, *params)
+
+    async def aclose(self):
+        await self.pool.close()
+
+
+class SqliteClient(SqlClient):
+    """Substituto local para testes; uma conexão só, sem pool."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def placeholder(self, index: int):
+        return "?"
+
+    def in_condition(self, column, values, param):
+        if not values:
+            return "0"
+        return f"{column} IN ({', '.join(param(column, value) for value in values)})"
+
+    def encode(self, column, value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return super().encode(column, value)
+
+    def decode(self, row):
+        # SQLite guarda bool como 0/1
+        row = super().decode(row)
+        for column in BOOLEAN_COLUMNS & row.keys():
+            if row[column] is not None:
+                row[column] = bool(row[column])
+        return row
+
+    async def fetch(self, sql, params):
+        async with self.conn.execute(sql, params) as cursor:
+            rows = await cursor.fetchall()
+        if not sql.startswith("SELECT"):
+            await self.conn.commit()
+        return rows
+
+    async def aclose(self):
+        await self.conn.close()
+
+
+async def create_postgres_client(dsn: str):
+    import asyncpg
+
+    pool = await asyncpg.create_pool(
+        dsn,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+    )
+    return PostgresClient(pool)
+
+
+async def create_sqlite_client(path: str):
+    import aiosqlite
+
+    conn = await aiosqlite.connect(path)
+    conn.row_factory = aiosqlite.Row
+    await conn.executescript(SQLITE_SCHEMA)
+    await conn.commit()
+    return SqliteClient(conn)
@@ -1,4 +1,9 @@
 from supabase import Client, create_client
+from supabase._async.client import AsyncClient, create_client as create_async_client
+from supabase.lib.client_options import ClientOptions
+from gotrue import AsyncMemoryStorage
+from fastapi import HTTPException
+import httpx
 import os
 from dotenv import load_dotenv, find_dotenv
 
@@ -7,10 +12,82 @@ load_dotenv(find_dotenv())
 api_url: str = os.getenv("SUPABASE_URL")
 key: str = os.getenv("SUPABASE_KEY")
 
+# supabase (REST, padrão), postgres (asyncpg direto em DATABASE_URL) ou sqlite (SQLITE_PATH, para testes)
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase")
+DATABASE_URL = os.getenv("DATABASE_URL")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "backend.sqlite3")
+
+# Limites do pool de conexões HTTP compartilhado pela aplicação
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+
+_async_client: AsyncClient = None
+
 def create_supabase_client():
     supabase: Client = create_client(api_url, key)
     return supabase
 
+async def create_pooled_supabase_client(url: str = None, api_key: str = None):
+    """
+    Cliente assíncrono com um único pool keep-alive de conexões para o PostgREST.
+    """
+    options = ClientOptions(storage=AsyncMemoryStorage(), postgrest_client_timeout=SUPABASE_TIMEOUT)
+    client = await create_async_client(url or api_url, api_key or key, options)
+
+    # O PostgREST cria a própria sessão httpx sem limites configuráveis; trocamos por uma com pool
+    postgrest = client.postgrest
+    default_session = postgrest.session
+    postgrest.session = httpx.AsyncClient(
+        base_url=default_session.base_url,
+        headers=default_session.headers,
+        timeout=SUPABASE_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+        follow_redirects=True,
+        http2=True,
+    )
+    await default_session.aclose()
+    return client
+
+async def init_supabase():
+    global _async_client
+    if DB_BACKEND == "postgres":
+        from database.sql_client import create_postgres_client
+        if not DATABASE_URL:
+            print("DATABASE_URL não configurada; rotas de banco ficarão indisponíveis.")
+            return
+        _async_client = await create_postgres_client(DATABASE_URL)
+        return
+    if DB_BACKEND == "sqlite":
+        from database.sql_client import create_sqlite_client
+        _async_client = await create_sqlite_client(SQLITE_PATH)
+        return
+
+    if not api_url or not key:
+        print("SUPABASE_URL/SUPABASE_KEY não configurados; rotas de banco ficarão indisponíveis.")
+        return
+    _async_client = await create_pooled_supabase_client()
+
+async def close_supabase():
+    global _async_client
+    if _async_client is not None:
+        if DB_BACKEND in ("postgres", "sqlite"):
+            await _async_client.aclose()
+        else:
+            await _async_client.postgrest.aclose()
+        _async_client = None
+
+def get_supabase() -> AsyncClient:
+    """Dependência FastAPI: cliente compartilhado criado no lifespan da aplicação."""
+    if _async_client is None:
+        raise HTTPException(status_code=503, detail="Banco de dados indisponível")
+    return _async_client
+
 def query_table(table: str, columns: str):
     """
     Table deve ser o nome da tabela, como 'users'.
@@ -1,14 +1,41 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import predict, user, logs
+from contextlib import asynccontextmanager
+from routers import predict, user, logs, metrics, jobs
+from utils.model_registry import model_registry, PRELOAD_MODELS
+from utils.executor import inference_executor
+from utils.batching import stop_batchers
+from utils.startup import boot_report
+from database.supabase import init_supabase, close_supabase
 import uvicorn
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Carrega e aquece os modelos uma única vez, antes de aceitar requisições
+    if PRELOAD_MODELS:
+        model_registry.load_all()
+    inference_executor.start()
+    await init_supabase()
+    logs.log_writer.start()
+    jobs.job_manager.start()
+    boot_report()
+    yield
+    await jobs.job_manager.stop()
+    # Os batchers ficam presos a este event loop; o próximo lifespan cria outros
+    await stop_batchers()
+    await logs.log_writer.stop()
+    await close_supabase()
+    inference_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(predict.router)
+app.include_router(jobs.router)
 app.include_router(user.router)
 app.include_router(logs.router)
+app.include_router(metrics.router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from schemas.predict import Predict
+from utils.inference import PREDICTORS
+from utils.jobs import JobManager, JobLimitError, JobQueueFull
+from utils.admission import AdmissionRejected, HorizonRejected, client_key, rejected_response, stream_client_key
+from database.supabase import get_supabase
+from routers.logs import create_log, get_formatted_datetime
+from typing import Optional
+import json
+import os
+
+# Intervalo do comentário de keep-alive no SSE e do ping no WebSocket
+JOB_STREAM_HEARTBEAT = float(os.getenv("JOB_STREAM_HEARTBEAT", "15"))
+
+router = APIRouter(
+    prefix="/predicts/jobs",
+    tags=["jobs"],
+)
+
+async def persist_job(job):
+    response = await get_supabase().table('predict').insert({
+        "username_predict": job.username,
+        "date": get_formatted_datetime(),
+        "user_id": job.user_id,
+        "forecast": True,
+        "forecast_result": job.result,
+        "model": job.modelo
+    }).execute()
+
+    await create_log(
+        username_log=job.username,
+        action=f"Predict feita com sucesso com o modelo {job.modelo} (job {job.id})",
+        user_id=job.user_id
+    )
+
+    return response.data[0]["id"] if response.data else None
+
+job_manager = JobManager(persist_job)
+
+async def job_events(job, offset: int = 0):
+    """
+    Eventos do job a partir do ponto `offset`: {"event": "point"} para cada dia,
+    {"event": "status"} quando ele termina e None a cada heartbeat sem novidades.
+    """
+    sent = offset
+    while True:
+        while sent < len(job.points):
+            yield {"event": "point", "data": job.points[sent]}
+            sent += 1
+        if job.finished:
+            yield {"event": "status", "data": job.info(offset=len(job.points))}
+            return
+        if not await job.wait_change(JOB_STREAM_HEARTBEAT):
+            yield None
+
+def not_found(job_id: str):
+    # Job de outro cliente também responde 404, para não revelar que o id existe
+    return JSONResponse(content={"error": f"Job '{job_id}' não encontrado"}, status_code=404)
+
+@router.post("/{modelo}", status_code=202)
+async def create_job(modelo: str, data: Predict, key: str = Depends(client_key)):
+    if modelo not in PREDICTORS:
+        return JSONResponse(content={"error": f"Modelo '{modelo}' não encontrado."}, status_code=404)
+    try:
+        # Mesmo limite de horizonte e mesmos buckets das previsões síncronas; a espera fica na fila de jobs.
+        # O dono do job é `key`; data.user_id só vai para a linha gravada em predict
+        job = job_manager.submit(modelo, data.days, key, user_id=data.user_id, username=data.username)
+    except HorizonRejected as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except AdmissionRejected as e:
+        return rejected_response(e)
+    except JobLimitError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=429)
+    except JobQueueFull as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503, headers={"Retry-After": "5"})
+
+    return {"message": "Job criado", "job_id": job.id, "status": job.status}
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1),
+                  key: str = Depends(client_key)):
+    job = job_manager.get(job_id, key)
+    if job is None:
+        return not_found(job_id)
+    return {"message": "Job", "job": job.info(offset, limit)}
+
+@router.get("/{job_id}/events")
+async def job_event_stream(job_id: str, offset: int = Query(0, ge=0), key: str = Depends(stream_client_key)):
+    job = job_manager.get(job_id, key)
+    if job is None:
+        return not_found(job_id)
+
+    async def stream():
+        async for event in job_events(job, offset):
+            if event is None:
+                yield ": ping\n\n"
+            else:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.websocket("/{job_id}/ws")
+async def job_websocket(websocket: WebSocket, job_id: str, offset: int = 0, key: str = Depends(stream_client_key)):
+    await websocket.accept()
+    job = job_manager.get(job_id, key)
+    if job is None:
+        await websocket.send_json({"event": "error", "data": {"error": f"Job '{job_id}' não encontrado"}})
+        await websocket.close(code=1008)
+        return
+
+    try:
+        async for event in job_events(job, offset):
+            await websocket.send_json(event if event is not None else {"event": "ping"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str, key: str = Depends(client_key)):
+    try:
+        job = job_manager.cancel(job_id, key)
+    except KeyError:
+        return not_found(job_id)
+    return {"message": "Cancelamento solicitado", "job_id": job.id, "status": job.status}
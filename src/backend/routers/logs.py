@@ -1,12 +1,21 @@
 import ormar
 import ormar.exceptions
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
-from schemas.logs import LogCreate, LogUpdate
+from schemas.logs import LogCreate, LogUpdate, LogBulkUpdate
+from schemas.bulk import BulkIds
+from utils.logs import LogWriter
 import pytz 
 from datetime import datetime
-from database.supabase import create_supabase_client
+from database.supabase import get_supabase
+from database.repository import (
+    list_page, iter_pages, column_list, update_by_id, delete_by_id, update_rows, delete_rows, missing_ids,
+    DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT,
+)
+from utils.export import export_response
+from supabase._async.client import AsyncClient
 import traceback
+from typing import Optional
 
 SAO_PAULO_TZ = pytz.timezone('America/Sao_Paulo')
 
@@ -19,51 +28,81 @@ def get_formatted_datetime():
     now = datetime.now(SAO_PAULO_TZ)
     return now.strftime('%d/%m/%Y_%Hh%M')
 
-async def create_log(username_log: str, action: str, user_id: int = None):
-    supabase = create_supabase_client()
-
-    try:
-        log_data = {
-            "username_log": username_log,
-            "action": action,
-            "date": get_formatted_datetime()
-        }
+async def insert_logs(rows: list):
+    await get_supabase().table('logs').insert(rows).execute()
 
-        if user_id is not None:
-            log_data["user_id"] = user_id
+log_writer = LogWriter(insert_logs)
 
-        response = supabase.table('logs').insert(log_data).execute()
+async def create_log(username_log: str, action: str, user_id: int = None):
+    # Só enfileira: o insert em lote acontece em segundo plano (utils/logs.py)
+    # Todas as linhas com as mesmas chaves: o insert em lote do PostgREST exige isso
+    log_data = {
+        "username_log": username_log,
+        "action": action,
+        "date": get_formatted_datetime(),
+        "user_id": user_id
+    }
 
-        return response.data
+    await log_writer.enqueue(log_data)
 
-    except Exception as e:
-        error_trace = traceback.format_exc()
-        print(f"Full error trace: {error_trace}")
-        raise HTTPException(status_code=500, detail=f"Erro ao registrar log: {str(e)}")
+    return [log_data]
 
+# /history/{user_id} é o mesmo filtro de /list/?user_id=, mantido como atalho
 @router.get("/list/")
-async def list_logs():
-    supabase = create_supabase_client()
-
+@router.get("/history/{user_id}")
+async def list_logs(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[int] = None,
+    fields: Optional[str] = None,
+    user_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    supabase: AsyncClient = Depends(get_supabase),
+):
     try:
-        response = supabase.table('logs').select("*").execute()
+        logs, next_cursor = await list_page(
+            supabase, 'logs', limit=limit, cursor=cursor, fields=fields,
+            filters={"user_id": user_id}, date_from=date_from, date_to=date_to,
+        )
 
-        if response.data:
-            return {"message": "Lista de logs na base", "logs": response.data}
+        if logs:
+            return {"message": "Lista de logs na base", "logs": logs, "next_cursor": next_cursor}
         else:
             return JSONResponse(content={"error": "Nenhum log encontrado"}, status_code=404)
 
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Full error trace: {error_trace}")
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
-@router.get("/get/{log_id}")
-async def get_log(log_id: int):
-    supabase = create_supabase_client()
+@router.get("/export")
+async def export_logs(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    cursor: Optional[int] = None,
+    fields: Optional[str] = None,
+    user_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page_size: int = Query(MAX_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    supabase: AsyncClient = Depends(get_supabase),
+):
+    # Exporta a tabela inteira em páginas; retome com cursor=<último id recebido>
+    try:
+        columns = column_list('logs', fields)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    pages = iter_pages(supabase, 'logs', page_size=page_size, cursor=cursor, fields=fields,
+                       filters={"user_id": user_id}, date_from=date_from, date_to=date_to)
+    return export_response(pages, 'logs', columns, export_format)
 
+@router.get("/get/{log_id}")
+async def get_log(log_id: int, supabase: AsyncClient = Depends(get_supabase)):
     try: 
-        response = supabase.table('logs').select("*").eq("id", log_id).execute()
+        response = await supabase.table('logs').select("*").eq("id", log_id).execute()
 
         if response.data:
             return {"message": "Log requisitado", "log": response.data}
@@ -76,19 +115,33 @@ async def get_log(log_id: int):
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
 @router.put("/update/{log_id}")
-async def update_user(log_id: int, log_update: LogUpdate):
-    supabase = create_supabase_client()
-
+async def update_user(log_id: int, log_update: LogUpdate, supabase: AsyncClient = Depends(get_supabase)):
     try: 
-        response = supabase.table('logs').select("*").eq("id", log_id).execute()
+        log = await update_by_id(supabase, 'logs', log_id, {
+            "username_log": log_update.username_log,
+            "action": log_update.action,
+        })
 
-        if response.data:
-            response = supabase.table('logs').update({
-                "username_log": log_update.username_log,
-                "action": log_update.action,
-            }).eq("id", log_id).execute()
+        if log:
+            return {"message": "Log atualizado com sucesso", "log": [log]}
+        else:
+            return JSONResponse(content={"error": "Nenhum log encontrado"}, status_code=404)
+
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Full error trace: {error_trace}")
+        return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
-            return {"message": "Log atualizado com sucesso", "log": response.data}
+@router.put("/update_many/")
+async def update_logs(log_update: LogBulkUpdate, supabase: AsyncClient = Depends(get_supabase)):
+    try:
+        logs = await update_rows(supabase, 'logs', {
+            "username_log": log_update.username_log,
+            "action": log_update.action,
+        }, log_update.ids)
+
+        if logs:
+            return {"message": "Logs atualizados com sucesso", "logs": logs, "missing": missing_ids(log_update.ids, logs)}
         else:
             return JSONResponse(content={"error": "Nenhum log encontrado"}, status_code=404)
 
@@ -98,15 +151,11 @@ async def update_user(log_id: int, log_update: LogUpdate):
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
 @router.delete("/delete/{log_id}")
-async def delete_user(log_id: int):
-    supabase = create_supabase_client()
-
+async def delete_user(log_id: int, supabase: AsyncClient = Depends(get_supabase)):
     try:
-        response = supabase.table('logs').select("*").eq("id", log_id).execute()
-
-        if response.data:
-            response = supabase.table('logs').delete().eq("id", log_id).execute()
+        log = await delete_by_id(supabase, 'logs', log_id)
 
+        if log:
             return JSONResponse(content={
                 "error": False,
                 "message": "Log deletado com sucesso"
@@ -126,3 +175,28 @@ async def delete_user(log_id: int):
             "trace": error_trace
         }, status_code=500)
 
+@router.post("/delete_many/")
+async def delete_logs(body: BulkIds, supabase: AsyncClient = Depends(get_supabase)):
+    try:
+        logs = await delete_rows(supabase, 'logs', body.ids)
+
+        if logs:
+            return JSONResponse(content={
+                "error": False,
+                "message": f"{len(logs)} logs deletados com sucesso",
+                "missing": missing_ids(body.ids, logs)
+            }, status_code=200)
+        else:
+            return JSONResponse(content={
+                "error": True,
+                "message": "Nenhum log encontrado"
+            }, status_code=404)
+
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Full error trace: {error_trace}")
+        return JSONResponse(content={
+            "error": True,
+            "message": f"Erro interno do servidor: {e}",
+            "trace": error_trace
+        }, status_code=500)
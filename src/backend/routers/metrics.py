@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from utils.metrics import snapshot_all
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+)
+
+@router.get("/")
+async def list_metrics():
+    return {"message": "Métricas do backend", "metrics": snapshot_all()}
@@ -1,8 +1,19 @@
-from fastapi import APIRouter
-from utils.lstm.PredictLstm import main
-from schemas.predict import Predict, Predict_update
-from database.supabase import create_supabase_client
-from typing import Any
+from fastapi import APIRouter, Depends, Query
+from utils.inference import run_forecast, run_ensemble, ensemble_models, ensemble_weights, PREDICTORS, PRICE_DATA_PATH
+from utils.model_registry import model_registry, model_path_for, MODEL_NAMES
+from utils.backtest import run_backtest, BACKTEST_MAX_HORIZON
+from utils.admission import admission, AdmissionRejected, HorizonRejected, client_key, rejected_response
+from schemas.predict import Predict, EnsemblePredict, Predict_update, Predict_bulk_update
+from schemas.bulk import BulkIds
+from database.supabase import get_supabase
+from database.repository import (
+    list_page, latest, iter_pages, column_list, update_by_id, delete_by_id, update_rows, delete_rows, missing_ids,
+    DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT,
+)
+from utils.export import export_response
+from utils.forecast_codec import expand_forecast, forecast_length, validate_forecast
+from supabase._async.client import AsyncClient
+from typing import Any, List, Optional
 from fastapi.responses import JSONResponse
 import traceback
 import pytz 
@@ -20,17 +31,90 @@ def get_formatted_datetime():
     now = datetime.now(SAO_PAULO_TZ)
     return now.strftime('%d/%m/%Y_%Hh%M')
                       
-@router.post("/predict/{modelo}")
-async def predict_knr(modelo: str, data: Predict):
-    supabase = create_supabase_client()
+def present_forecast(predict: dict, expand: bool = False, offset: int = 0, limit: Optional[int] = None):
+    # Guardado compacto; a lista de {date, predicted_value} só é montada quando pedida
+    if "forecast_result" in predict:
+        predict["forecast_total"] = forecast_length(predict["forecast_result"])
+        if expand:
+            predict["forecast_result"] = expand_forecast(predict["forecast_result"], offset, limit)
+    return predict
+
+def predict_values(predict_update: Predict_update):
+    values = {
+        "username_predict": predict_update.username,
+        "forecast": predict_update.forecast,
+    }
+    # Sem forecast_result o resultado atual fica como está; lança ValueError se inválido
+    if predict_update.forecast_result is not None:
+        values["forecast_result"] = validate_forecast(predict_update.forecast_result)
+    if predict_update.model is not None:
+        values["model"] = predict_update.model
+    return values
+
+@router.post("/predict")
+async def predict_ensemble(data: EnsemblePredict, supabase: AsyncClient = Depends(get_supabase),
+                           key: str = Depends(client_key)):
+    # Vários modelos na mesma requisição: série preparada uma vez para todos
+    try:
+        # Modelos e pesos validados antes da admissão, para não gastar tokens com pedido inválido
+        models = ensemble_models(data.models)
+        ensemble_weights(models, data.method, data.weights)
+        label = "ensemble:" + "+".join(models)
+        async with admission.admit(key, data.days, models=len(models)):
+            prediction_result = await run_ensemble(models, data.days, data.method, data.weights)
+    except AdmissionRejected as e:
+        return rejected_response(e)
+    except KeyError as e:
+        return JSONResponse(content={"error": f"Modelo {e} não encontrado."}, status_code=404)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"Error during ensemble prediction: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+    try:
+        response = await supabase.table('predict').insert({
+            "username_predict": data.username,
+            "date": get_formatted_datetime(),
+            "user_id": data.user_id,
+            "forecast": data.forecast,
+            "forecast_result": prediction_result,
+            "model": label
+        }).execute()
+
+        await create_log(
+            username_log=data.username,
+            action=f"Predict feita com sucesso com o {label}",
+            user_id=data.user_id
+        )
 
+        return {"status": "success", "data": response.data}
+    except Exception as e:
+        print(f"Error inserting data into Supabase: {str(e)}")
+        await create_log(
+            username_log=data.username,
+            action=f"Predict falhou com o {label}",
+            user_id=data.user_id
+        )
+
+        return {"status": "error", "message": str(e)}
+
+@router.post("/predict/{modelo}")
+async def predict_knr(modelo: str, data: Predict, supabase: AsyncClient = Depends(get_supabase),
+                      key: str = Depends(client_key)):
     print(f"Received data: {data}")
     print(f"Model: {modelo}")
 
-    csv_file_path = 'backend/utils/eth_historical_data.csv'  
-    model_path = f'backend/utils/{modelo}/model_{modelo}.pkl'  
+    if modelo == "ensemble":
+        return await predict_ensemble(EnsemblePredict(**data.model_dump()), supabase, key)
+
+    csv_file_path = PRICE_DATA_PATH
+    model_path = model_path_for(modelo)
     forecast_days = data.days  
 
+    if modelo not in PREDICTORS:
+        return {"status": "error", "message": f"Modelo '{modelo}' não encontrado."}
+
     if data.forecast:
         try:
             print('Iniciando previsão...')
@@ -38,8 +122,13 @@ async def predict_knr(modelo: str, data: Predict):
             print(f"Model path: {model_path}")
             print(f"Forecast days: {forecast_days}")
 
-            prediction_result = main(csv_file_path, model_path, forecast_days)
+            async with admission.admit(key, forecast_days):
+                prediction_result = await run_forecast(modelo, forecast_days)
             print(f"Prediction result: {prediction_result}")
+        except HorizonRejected as e:
+            return JSONResponse(content={"error": str(e)}, status_code=400)
+        except AdmissionRejected as e:
+            return rejected_response(e)
         except FileNotFoundError:
             print(f"File not found: {csv_file_path} or {model_path}")
             return {"status": "error", "message": f"Modelo '{modelo}' não encontrado."}
@@ -48,7 +137,7 @@ async def predict_knr(modelo: str, data: Predict):
             return {"status": "error", "message": str(e)}
 
     try:
-        response = supabase.table('predict').insert({
+        response = await supabase.table('predict').insert({
             "username_predict": data.username,
             "date": get_formatted_datetime(),
             "user_id": data.user_id,
@@ -74,32 +163,128 @@ async def predict_knr(modelo: str, data: Predict):
 
         return {"status": "error", "message": str(e)}
 
+@router.get("/models")
+async def list_models():
+    return {"message": "Modelos carregados", "models": model_registry.list_models()}
+
+@router.get("/backtest")
+async def backtest_models(
+    models: List[str] = Query(list(MODEL_NAMES)),
+    horizon: int = Query(30, ge=1, le=BACKTEST_MAX_HORIZON),
+    stride: int = Query(1, ge=1),
+    key: str = Depends(client_key),
+):
+    try:
+        results = await run_backtest(models, horizon, stride, client=key)
+        return {"message": "Backtest walk-forward", "horizon": horizon, "stride": stride, "results": results}
+
+    except AdmissionRejected as e:
+        return rejected_response(e)
+
+    except KeyError as e:
+        return JSONResponse(content={"error": f"Modelo {e} não encontrado."}, status_code=404)
+
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Full error trace: {error_trace}")
+        return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
+
+# /history/{user_id} é o mesmo filtro de /list/?user_id=, mantido como atalho
 @router.get("/list/")
-async def list_predict():
-    supabase = create_supabase_client()
+@router.get("/history/{user_id}")
+async def list_predict(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[int] = None,
+    fields: Optional[str] = None,
+    user_id: Optional[int] = None,
+    model: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    supabase: AsyncClient = Depends(get_supabase),
+):
+    try:
+        predicts, next_cursor = await list_page(
+            supabase, 'predict', limit=limit, cursor=cursor, fields=fields,
+            filters={"user_id": user_id, "model": model}, date_from=date_from, date_to=date_to,
+        )
+
+        if predicts:
+            return {"message": "Lista de predicts na base", "predict": predicts, "next_cursor": next_cursor}
+        else:
+            return JSONResponse(content={"error": "Nenhuma predict encontrada"}, status_code=404)
+
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
 
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Full error trace: {error_trace}")
+        return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
+
+@router.get("/latest")
+async def latest_predict(
+    fields: Optional[str] = None,
+    user_id: Optional[int] = None,
+    model: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    expand: bool = False,
+    supabase: AsyncClient = Depends(get_supabase),
+):
     try:
-        response = supabase.table('predict').select("*").execute()
+        predict = await latest(supabase, 'predict', fields=fields, filters={"user_id": user_id, "model": model})
 
-        if response.data:
-            return {"message": "Lista de predicts na base", "predict": response.data}
+        if predict:
+            return {"message": "Última predict", "predict": present_forecast(predict, expand, offset, limit)}
         else:
             return JSONResponse(content={"error": "Nenhuma predict encontrada"}, status_code=404)
 
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Full error trace: {error_trace}")
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
-@router.get("/get/{predict_id}")
-async def get_predict(predict_id: int):
-    supabase = create_supabase_client()
+@router.get("/export")
+async def export_predict(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    cursor: Optional[int] = None,
+    fields: Optional[str] = None,
+    user_id: Optional[int] = None,
+    model: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page_size: int = Query(MAX_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    supabase: AsyncClient = Depends(get_supabase),
+):
+    # Exporta a tabela inteira em páginas; retome com cursor=<último id recebido>
+    try:
+        columns = column_list('predict', fields)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
 
+    pages = iter_pages(supabase, 'predict', page_size=page_size, cursor=cursor, fields=fields,
+                       filters={"user_id": user_id, "model": model}, date_from=date_from, date_to=date_to)
+    return export_response(pages, 'predict', columns, export_format)
+
+@router.get("/get/{predict_id}")
+async def get_predict(
+    predict_id: int,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    expand: bool = False,
+    supabase: AsyncClient = Depends(get_supabase),
+):
     try: 
-        response = supabase.table('predict').select("*").eq("id", predict_id).execute()
+        response = await supabase.table('predict').select("*").eq("id", predict_id).execute()
 
         if response.data:
-            return {"message": "Predict requisitada", "user": response.data}
+            return {"message": "Predict requisitada", "predict": [present_forecast(response.data[0], expand, offset, limit)]}
         else:
             return JSONResponse(content={"error": "Nenhuma Predict encontrada"}, status_code=404)
 
@@ -108,41 +293,49 @@ async def get_predict(predict_id: int):
         print(f"Full error trace: {error_trace}")
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
-
 @router.put("/update/{predict_id}")
-async def update_user(predict_id: int, predict_update: Predict_update):
-    supabase = create_supabase_client()
-
+async def update_user(predict_id: int, predict_update: Predict_update, supabase: AsyncClient = Depends(get_supabase)):
     try: 
-        response = supabase.table('predict').select("*").eq("id", predict_id).execute()
+        predict = await update_by_id(supabase, 'predict', predict_id, predict_values(predict_update))
 
-        if response.data:
-            response = supabase.table('predict').update({
-                "username_predict": predict_update.username,
-                "forecast": predict_update.forecast,
-                "forecast_result": predict_update.forecast,
-                "model": predict_update.model
-            }).eq("id", predict_id).execute()
-
-            return {"message": "Predict atualizada com sucesso", "predict": response.data}
+        if predict:
+            return {"message": "Predict atualizada com sucesso", "predict": [predict]}
         else:
             return JSONResponse(content={"error": "Nenhuma predict encontrada"}, status_code=404)
 
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Full error trace: {error_trace}")
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
-@router.delete("/delete/{predict_id}")
-async def delete_predict(predict_id: int):
-    supabase = create_supabase_client()
-
+@router.put("/update_many/")
+async def update_predicts(predict_update: Predict_bulk_update, supabase: AsyncClient = Depends(get_supabase)):
     try:
-        response = supabase.table('predict').select("*").eq("id", predict_id).execute()
+        predicts = await update_rows(supabase, 'predict', predict_values(predict_update), predict_update.ids)
 
-        if response.data:
-            response = supabase.table('predict').delete().eq("id", predict_id).execute()
+        if predicts:
+            return {"message": "Predicts atualizadas com sucesso", "predict": predicts,
+                    "missing": missing_ids(predict_update.ids, predicts)}
+        else:
+            return JSONResponse(content={"error": "Nenhuma predict encontrada"}, status_code=404)
+
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
 
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Full error trace: {error_trace}")
+        return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
+
+@router.delete("/delete/{predict_id}")
+async def delete_predict(predict_id: int, supabase: AsyncClient = Depends(get_supabase)):
+    try:
+        predict = await delete_by_id(supabase, 'predict', predict_id)
+
+        if predict:
             return JSONResponse(content={
                 "error": False,
                 "message": "Predict deletada com sucesso"
@@ -160,4 +353,30 @@ async def delete_predict(predict_id: int):
             "error": True,
             "message": f"Erro interno do servidor: {e}",
             "trace": error_trace
-        }, status_code=500)
\ No newline at end of file
+        }, status_code=500)
+
+@router.post("/delete_many/")
+async def delete_predicts(body: BulkIds, supabase: AsyncClient = Depends(get_supabase)):
+    try:
+        predicts = await delete_rows(supabase, 'predict', body.ids)
+
+        if predicts:
+            return JSONResponse(content={
+                "error": False,
+                "message": f"{len(predicts)} predicts deletadas com sucesso",
+                "missing": missing_ids(body.ids, predicts)
+            }, status_code=200)
+        else:
+            return JSONResponse(content={
+                "error": True,
+                "message": "Nenhuma predict encontrada"
+            }, status_code=404)
+
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Full error trace: {error_trace}")
+        return JSONResponse(content={
+            "error": True,
+            "message": f"Erro interno do servidor: {e}",
+            "trace": error_trace
+        }, status_code=500)
@@ -1,27 +1,62 @@
 import ormar
 import ormar.exceptions
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
-from schemas.user import UserCreate
-from utils.crypto import get_password_hash, verify_password
-from database.supabase import create_supabase_client
+from schemas.user import UserCreate, TokenRefresh
+from schemas.bulk import BulkIds
+from utils.crypto import hash_password, verify_and_update, create_token_pair, decode_token
+from utils.auth import get_current_user
+from utils.cache import LRUTTLCache
+from utils.metrics import counter
+from jose import JWTError
+from database.supabase import get_supabase
+from database.repository import (
+    list_page, update_by_id, delete_by_id, delete_rows, missing_ids, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT,
+)
+from supabase._async.client import AsyncClient
 import traceback
+from typing import Optional
 from routers.logs import create_log 
 from schemas.logs import LogCreate
+import os
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
 
 router = APIRouter(
     prefix="/users",
     tags=["users"],
 )
 
-@router.post("/register/")
-async def create_user(user: UserCreate):
-    supabase = create_supabase_client()
+# Perfis públicos (sem o hash da senha) por ("id", id) e ("username", username)
+user_profiles = LRUTTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+profile_hits = counter("user_profile_cache_hits")
+profile_misses = counter("user_profile_cache_misses")
+
+async def get_profile(supabase: AsyncClient, column: str, value):
+    profile = user_profiles.get((column, value))
+    if profile is not None:
+        profile_hits.inc()
+        return profile
+
+    profile_misses.inc()
+    response = await supabase.table('users').select("id,username").eq(column, value).execute()
+    # Só guarda resultados encontrados, para um usuário recém-criado não ficar "inexistente" até o TTL
+    if response.data:
+        user_profiles.set((column, value), response.data)
+    return response.data
+
+def invalidate_profiles(rows: list):
+    for row in rows:
+        user_profiles.pop(("id", row['id']))
+        user_profiles.pop(("username", row['username']))
 
-    hashed_password = get_password_hash(user.password)
+@router.post("/register/")
+async def create_user(user: UserCreate, supabase: AsyncClient = Depends(get_supabase)):
+    hashed_password = await hash_password(user.password)
 
     try:
-        response = supabase.table('users').insert({
+        response = await supabase.table('users').insert({
             "username": user.username,
             "password": hashed_password
         }).execute()
@@ -43,24 +78,38 @@ async def create_user(user: UserCreate):
 
         return JSONResponse(content={"error": str(e), "trace": error_trace}, status_code=400)
 
-@router.post("/login/")
-async def login(user: UserCreate):
-    supabase = create_supabase_client()
+async def rehash_password(supabase: AsyncClient, user_data: dict, new_hash: str):
+    # Hash com custo antigo: aproveita a senha em claro do login para atualizá-lo
+    try:
+        await supabase.table('users').update({"password": new_hash}).eq("id", user_data['id']).execute()
+        user_data['password'] = new_hash
+    except Exception as e:
+        print(f"Erro ao atualizar o hash da senha do usuário {user_data['id']}: {e}")
 
+@router.post("/login/")
+async def login(user: UserCreate, supabase: AsyncClient = Depends(get_supabase)):
     try:
-        response = supabase.table('users').select("*").eq("username", user.username).execute()
+        response = await supabase.table('users').select("*").eq("username", user.username).execute()
 
         if response.data:
             user_data = response.data[0]
             stored_password = user_data['password']
 
-            if verify_password(user.password, stored_password):
+            valid, new_hash = await verify_and_update(user.password, stored_password)
+
+            if valid:
+                if new_hash:
+                    await rehash_password(supabase, user_data, new_hash)
                 await create_log(
                     username_log=user.username,
                     action="Login bem-sucedido",
                     user_id=user_data['id']  
                 )
-                return {"message": "Login bem-sucedido", "user": user_data}
+                return {
+                    "message": "Login bem-sucedido",
+                    "user": {"id": user_data['id'], "username": user_data['username']},
+                    **create_token_pair(user_data),
+                }
             else:
                 await create_log(
                     username_log=user.username,
@@ -73,7 +122,7 @@ async def login(user: UserCreate):
             await create_log(
                 username_log=user.username,
                 action="Usuário não encontrado",
-                user_id=user_data['id']
+                user_id=None
             )
             return JSONResponse(content={"error": "Usuário não encontrado"}, status_code=404)
 
@@ -84,36 +133,58 @@ async def login(user: UserCreate):
         await create_log(
             username_log=user.username,
             action="Erro no login",
-            user_id=user_data['id']
+            user_id=None
         )
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
-@router.get("/list/")
-async def list_users():
-    supabase = create_supabase_client()
+@router.post("/refresh/")
+async def refresh_token(body: TokenRefresh, supabase: AsyncClient = Depends(get_supabase)):
+    try:
+        claims = decode_token(body.refresh_token, "refresh")
+    except JWTError:
+        return JSONResponse(content={"error": "Refresh token inválido ou expirado"}, status_code=401)
+
+    # Usuário removido depois do login não renova a sessão
+    profile = await get_profile(supabase, "id", int(claims["sub"]))
+    if not profile:
+        return JSONResponse(content={"error": "Usuário não encontrado"}, status_code=401)
 
+    return {"message": "Token renovado", **create_token_pair(profile[0])}
+
+@router.get("/me")
+async def current_user(user: dict = Depends(get_current_user)):
+    return {"message": "Usuário autenticado", "user": user}
+
+@router.get("/list/")
+async def list_users(
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[int] = None,
+    fields: Optional[str] = None,
+    supabase: AsyncClient = Depends(get_supabase),
+):
     try:
-        response = supabase.table('users').select("*").execute()
+        users, next_cursor = await list_page(supabase, 'users', limit=limit, cursor=cursor, fields=fields)
 
-        if response.data:
-            return {"message": "Lista de usuários na base", "users": response.data}
+        if users:
+            return {"message": "Lista de usuários na base", "users": users, "next_cursor": next_cursor}
         else:
             return JSONResponse(content={"error": "Nenhum usuário encontrado"}, status_code=404)
 
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Full error trace: {error_trace}")
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
     
 @router.get("/get_by_id/{user_id}")
-async def get_user_by_id(user_id: int):
-    supabase = create_supabase_client()
-
+async def get_user_by_id(user_id: int, supabase: AsyncClient = Depends(get_supabase)):
     try: 
-        response = supabase.table('users').select("*").eq("id", user_id).execute()
+        profile = await get_profile(supabase, "id", user_id)
 
-        if response.data:
-            return {"message": "Usuário requisitado", "user": response.data}
+        if profile:
+            return {"message": "Usuário requisitado", "user": profile}
         else:
             return JSONResponse(content={"error": "Nenhum usuário encontrado"}, status_code=404)
 
@@ -123,14 +194,12 @@ async def get_user_by_id(user_id: int):
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
 @router.get("/get/{username}")
-async def get_user(username: str):
-    supabase = create_supabase_client()
-
+async def get_user(username: str, supabase: AsyncClient = Depends(get_supabase)):
     try: 
-        response = supabase.table('users').select("*").eq("username", username).execute()
+        profile = await get_profile(supabase, "username", username)
 
-        if response.data:
-            return {"message": "Usuário requisitado", "user": response.data}
+        if profile:
+            return {"message": "Usuário requisitado", "user": profile}
         else:
             return JSONResponse(content={"error": "Nenhum usuário encontrado"}, status_code=404)
 
@@ -140,21 +209,19 @@ async def get_user(username: str):
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
 @router.put("/update/{user_id}")
-async def update_user(user_id: int, user: UserCreate):
-    supabase = create_supabase_client()
-
+async def update_user(user_id: int, user: UserCreate, supabase: AsyncClient = Depends(get_supabase)):
     try: 
-        response = supabase.table('users').select("*").eq("id", user_id).execute()
-
-        if response.data:
-            hashed_password = get_password_hash(user.password)
-
-            response = supabase.table('users').update({
-                "username": user.username,
-                "password": hashed_password
-            }).eq("id", user_id).execute()
+        hashed_password = await hash_password(user.password)
+        updated = await update_by_id(supabase, 'users', user_id, {
+            "username": user.username,
+            "password": hashed_password
+        })
 
-            return {"message": "Usuário atualizado com sucesso", "user": response.data}
+        if updated:
+            # O username antigo não volta no UPDATE: descarta todas as entradas por username
+            user_profiles.pop(("id", user_id))
+            user_profiles.invalidate(lambda key: key[0] == "username")
+            return {"message": "Usuário atualizado com sucesso", "user": [{"id": updated['id'], "username": updated['username']}]}
         else:
             return JSONResponse(content={"error": "Nenhum usuário encontrado"}, status_code=404)
 
@@ -164,15 +231,12 @@ async def update_user(user_id: int, user: UserCreate):
         return JSONResponse(content={"error": "Erro interno do servidor", "trace": error_trace}, status_code=500)
 
 @router.delete("/delete/{user_id}")
-async def delete_user(user_id: int):
-    supabase = create_supabase_client()
-
+async def delete_user(user_id: int, supabase: AsyncClient = Depends(get_supabase)):
     try:
-        response = supabase.table('users').select("*").eq("id", user_id).execute()
-
-        if response.data:
-            response = supabase.table('users').delete().eq("id", user_id).execute()
+        deleted = await delete_by_id(supabase, 'users', user_id)
 
+        if deleted:
+            invalidate_profiles([deleted])
             return JSONResponse(content={
                 "error": False,
                 "message": "Usuário deletado com sucesso"
@@ -192,3 +256,29 @@ async def delete_user(user_id: int):
             "trace": error_trace
         }, status_code=500)
 
+@router.post("/delete_many/")
+async def delete_users(body: BulkIds, supabase: AsyncClient = Depends(get_supabase)):
+    try:
+        deleted = await delete_rows(supabase, 'users', body.ids)
+
+        if deleted:
+            invalidate_profiles(deleted)
+            return JSONResponse(content={
+                "error": False,
+                "message": f"{len(deleted)} usuários deletados com sucesso",
+                "missing": missing_ids(body.ids, deleted)
+            }, status_code=200)
+        else:
+            return JSONResponse(content={
+                "error": True,
+                "message": "Nenhum usuário encontrado"
+            }, status_code=404)
+
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        print(f"Full error trace: {error_trace}")
+        return JSONResponse(content={
+            "error": True,
+            "message": f"Erro interno do servidor: {e}",
+            "trace": error_trace
+        }, status_code=500)
@@ -0,0 +1,6 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+class BulkIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
 
 class LogCreate(BaseModel):
     date: str
@@ -8,5 +10,7 @@ class LogCreate(BaseModel):
 
 class LogUpdate(BaseModel):
     username_log: str
-    action: str 
+    action: str
 
+class LogBulkUpdate(LogUpdate):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
@@ -1,3 +1,5 @@
+from typing import Any, Dict, List, Optional
+
 from pydantic import BaseModel, Field
 
 class Predict(BaseModel):
@@ -7,9 +9,19 @@ class Predict(BaseModel):
     days: int
     user_id: int 
 
+class EnsemblePredict(Predict):
+    models: List[str] = Field(default_factory=lambda: ["lstm", "gru"], min_length=1, max_length=10)
+    method: str = Field("mean", pattern="^(mean|weighted)$")
+    weights: Optional[Dict[str, float]] = None
+
 class Predict_update(BaseModel):
     username: str
     forecast: bool
-    forecast_result: str
+    # Formato compacto ou lista antiga; validado por forecast_codec.validate_forecast
+    forecast_result: Optional[Any] = None
+    model: Optional[str] = None
+
+class Predict_bulk_update(Predict_update):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
 
 
@@ -3,3 +3,6 @@ from pydantic import BaseModel
 class UserCreate(BaseModel):
     username: str
     password: str
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
@@ -0,0 +1,142 @@
+"""
+Servidor pré-fork: o processo pai importa a aplicação, carrega os modelos e a
+série de preços uma vez e só então cria os workers com fork(). Os pesos e as
+bibliotecas ficam em páginas compartilhadas (copy-on-write) entre os workers,
+em vez de uma cópia por worker como no `uvicorn --workers N`.
+
+Todos os workers aceitam conexões no mesmo socket, aberto pelo pai. Um worker
+que morre é recriado a partir do pai, sem repetir imports nem carga de modelos.
+
+Com INFERENCE_ENGINE=keras o pai não carrega os modelos: o runtime do TensorFlow
+não sobrevive a um fork, então cada worker carrega o seu no startup. O ganho de
+memória vem com INFERENCE_ENGINE=numpy.
+
+Uso, a partir de src/backend:
+    INFERENCE_ENGINE=numpy python serve.py --workers 4 [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from utils.startup import boot_report, format_imports, timed_imports
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Worker que morre antes disso é tratado como falha de boot: para tudo em vez de recriar em laço
+MIN_WORKER_UPTIME = 5.0
+
+PRELOAD_MODULES = ("numpy", "pandas", "sklearn.preprocessing", "fastapi", "supabase", "main")
+
+
+def preload():
+    start = time.perf_counter()
+    timings = timed_imports(PRELOAD_MODULES)
+    print(f"[pai {os.getpid()}] imports: {format_imports(timings)}")
+
+    from utils.inference import PRICE_DATA_PATH
+    from utils.model_registry import model_registry
+    from utils.price_series import get_price_series
+
+    if model_registry.engine == "numpy":
+        model_registry.load_all()
+    else:
+        print(f"[pai {os.getpid()}] engine {model_registry.engine}: modelos carregados em cada worker")
+    get_price_series(PRICE_DATA_PATH)
+
+    print(f"[pai {os.getpid()}] pré-carga em {(time.perf_counter() - start) * 1000:.0f} ms")
+    boot_report("pai")
+
+
+def bind(host: str, port: int):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock, args):
+    import uvicorn
+
+    from main import app
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    preload()
+    sock = bind(args.host, args.port)
+
+    # Objetos do pai vão para a geração permanente: o GC dos workers não os
+    # percorre e, portanto, não suja as páginas compartilhadas
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(sock, args)
+            except BaseException as e:
+                print(f"[worker {os.getpid()}] erro: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"[pai {os.getpid()}] {args.workers} workers em http://{args.host}:{args.port}")
+
+    exit_code = 0
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"[pai {os.getpid()}] worker {pid} terminou (status {status})")
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+        else:
+            spawn()
+
+    sock.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
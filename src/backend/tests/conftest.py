@@ -0,0 +1,12 @@
+"""
+Testes de unidade do backend. A partir de src/backend:
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# utils.crypto exige o segredo na importação (utils.admission -> utils.auth)
+os.environ.setdefault("JWT_SECRET", "test-secret")
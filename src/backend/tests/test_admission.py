@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.admission import AdmissionController, AdmissionRejected, HorizonRejected
+
+
+def make_controller(**kwargs):
+    options = dict(global_rate=1000, global_burst=100000, user_rate=1, user_burst=100,
+                   max_concurrent=1, queue_size=10, max_wait=0.2, max_days=100)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def tokens(controller, user):
+    bucket = controller._users.get(user)
+    bucket._refill(time.monotonic())
+    return bucket.tokens
+
+
+async def hold_slot(controller, user, days, started, release):
+    async with controller.admit(user, days):
+        started.set()
+        await release.wait()
+
+
+def test_horizon_and_cost_rejected_up_front():
+    controller = make_controller()
+
+    with pytest.raises(HorizonRejected):
+        controller.check_cost(0)
+    with pytest.raises(HorizonRejected):
+        controller.check_cost(101)
+    # Cabe no horizonte, mas 60 dias × 2 modelos passa da capacidade do bucket
+    with pytest.raises(HorizonRejected):
+        controller.check_cost(60, models=2)
+    assert controller.check_cost(50, models=2) == 100
+
+
+def test_rate_rejection_has_retry_after():
+    controller = make_controller()
+    assert controller.reserve("a", 100) == 0
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.reserve("a", 100)
+    assert rejected.value.reason == "rate"
+    assert rejected.value.retry_after >= 99
+    # Outro cliente tem o próprio bucket
+    assert controller.reserve("b", 100) == 0
+
+
+def test_deadline_rejection_refunds_tokens():
+    async def scenario():
+        controller = make_controller()
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold_slot(controller, "a", 10, started, release))
+        await started.wait()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit("b", 40):
+                pass
+        assert rejected.value.reason == "deadline"
+        assert tokens(controller, "b") == pytest.approx(100, abs=1)
+        assert controller._waiting == 0
+
+        release.set()
+        await holder
+        assert controller._in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_while_waiting_refunds_tokens():
+    async def scenario():
+        controller = make_controller(max_wait=5)
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold_slot(controller, "a", 10, started, release))
+        await started.wait()
+
+        waiter = asyncio.create_task(hold_slot(controller, "b", 40, asyncio.Event(), asyncio.Event()))
+        await asyncio.sleep(0.05)
+        assert controller._waiting == 1
+        assert tokens(controller, "b") == pytest.approx(60, abs=1)
+
+        # Cliente desconectou enquanto esperava a vaga
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert controller._waiting == 0
+        assert tokens(controller, "b") == pytest.approx(100, abs=1)
+
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+
+
+def test_queue_full_rejected_without_reserving():
+    async def scenario():
+        controller = make_controller(queue_size=1, max_wait=5)
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold_slot(controller, "a", 10, started, release))
+        await started.wait()
+        waiter = asyncio.create_task(hold_slot(controller, "b", 10, asyncio.Event(), release))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit("c", 10):
+                pass
+        assert rejected.value.reason == "queue"
+        assert controller._users.get("c") is None
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+
+    asyncio.run(scenario())
+
+
+def test_slot_is_shared_with_admit():
+    async def scenario():
+        controller = make_controller()
+        async with controller.slot():
+            assert controller._in_flight == 1
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with controller.admit("a", 10):
+                    pass
+            assert rejected.value.reason == "deadline"
+        assert controller._in_flight == 0
+
+        async with controller.admit("a", 10):
+            assert controller._in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_slots_work_on_a_new_event_loop():
+    controller = make_controller(max_wait=5)
+
+    async def scenario():
+        # Disputa pela vaga: o Semaphore passa a pertencer ao loop atual
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(hold_slot(controller, "a", 1, started, release))
+        await started.wait()
+        waiter = asyncio.create_task(hold_slot(controller, "b", 1, asyncio.Event(), release))
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(holder, waiter)
+
+    # Dois lifespans seguidos com o mesmo controlador
+    asyncio.run(scenario())
+    asyncio.run(scenario())
+    assert controller._in_flight == 0 and controller._waiting == 0
@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from utils import batching
+
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    # Modelo que prevê o último valor da janela + 1
+    class Registry:
+        def get(self, name):
+            return name
+
+    def get_step(model):
+        def step(batch):
+            return batch[:, -1, 0] + 1
+        return step
+
+    monkeypatch.setattr(batching, "model_registry", Registry())
+    monkeypatch.setattr(batching, "get_step", get_step)
+    yield
+    batching._batchers.clear()
+
+
+WINDOW = np.zeros(60, dtype=np.float32)
+
+
+async def forecast(days):
+    return await asyncio.wait_for(batching.get_batcher("lstm").submit(WINDOW, days), 2)
+
+
+def test_batcher_works_across_event_loops():
+    # O primeiro loop continua aberto, com a task do lote parada nele (outro lifespan, TestClient)
+    loop = asyncio.new_event_loop()
+    try:
+        first = loop.run_until_complete(forecast(3))
+        second = asyncio.run(forecast(3))
+    finally:
+        loop.run_until_complete(batching.stop_batchers())
+        loop.close()
+
+    np.testing.assert_array_equal(first, [1, 2, 3])
+    np.testing.assert_array_equal(second, [1, 2, 3])
+    # O batcher do loop fechado pelo asyncio.run é descartado no próximo get_batcher
+    asyncio.run(forecast(1))
+    assert len(batching._batchers) == 1
+
+
+def test_concurrent_requests_share_steps():
+    async def scenario():
+        return await asyncio.gather(forecast(2), forecast(4))
+
+    short, long = asyncio.run(scenario())
+    np.testing.assert_array_equal(short, [1, 2])
+    np.testing.assert_array_equal(long, [1, 2, 3, 4])
+
+
+def test_stop_batchers_cancels_pending_and_clears():
+    async def scenario():
+        batcher = batching.get_batcher("lstm")
+        batcher.window_ms = 1000
+        pending = asyncio.ensure_future(batcher.submit(WINDOW, 3))
+        await asyncio.sleep(0.05)
+
+        await batching.stop_batchers()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        assert batching._batchers == {}
+        # Depois do stop, um novo pedido cria outro batcher
+        np.testing.assert_array_equal(await forecast(1), [1])
+
+    asyncio.run(scenario())
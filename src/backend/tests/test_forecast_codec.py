@@ -0,0 +1,88 @@
+import base64
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from utils.forecast_codec import (
+    decode_values, encode_forecast, expand_forecast, forecast_length, validate_forecast,
+)
+
+START = datetime(2024, 10, 1, 17, 0, 0)
+
+
+def compact(count=10, **kwargs):
+    values = np.arange(count, dtype=np.float32) + 0.5
+    return values, encode_forecast(values, START, **kwargs)
+
+
+def test_round_trip_keeps_float32_values():
+    values, forecast = compact(10)
+
+    assert forecast["count"] == forecast_length(forecast) == 10
+    np.testing.assert_array_equal(decode_values(forecast), values)
+    items = expand_forecast(forecast)
+    assert [item["predicted_value"] for item in items] == values.tolist()
+    assert items[0]["date"] == "2024-10-01 17:00:00"
+    assert items[-1]["date"] == "2024-10-10 17:00:00"
+
+
+def test_expand_page_with_offset_and_limit():
+    _, forecast = compact(10, step_days=2)
+
+    page = expand_forecast(forecast, offset=3, limit=4)
+    assert [item["predicted_value"] for item in page] == [3.5, 4.5, 5.5, 6.5]
+    assert page[0]["date"] == "2024-10-07 17:00:00"
+    # Página que passa do fim é cortada; offset depois do fim devolve vazio
+    assert len(expand_forecast(forecast, offset=8, limit=5)) == 2
+    assert expand_forecast(forecast, offset=20) == []
+
+
+def test_expand_bands_and_members():
+    values = np.array([1.0, 2.0, 3.0], dtype=np.float32)
+    forecast = encode_forecast(values, START, bands={"lower": values - 1, "upper": values + 1},
+                               members={"lstm": values, "gru": values * 2})
+
+    item = expand_forecast(forecast, offset=1, limit=1)[0]
+    assert item["lower"] == 1.0 and item["upper"] == 3.0
+    assert item["members"] == {"lstm": 2.0, "gru": 4.0}
+    assert validate_forecast(forecast) is forecast
+
+
+def test_legacy_list_still_accepted():
+    legacy = [{"date": "2024-10-01 17:00:00", "predicted_value": 1.5},
+              {"date": "2024-10-02 17:00:00", "predicted_value": 2}]
+
+    assert validate_forecast(legacy) is legacy
+    assert expand_forecast(legacy, offset=1) == legacy[1:]
+    with pytest.raises(ValueError):
+        validate_forecast([{"date": "2024-10-01 17:00:00", "predicted_value": "1.5"}])
+
+
+@pytest.mark.parametrize("change", [
+    # base64 inválido e bytes que não fecham um float32
+    {"values": "abc"},
+    {"values": base64.b64encode(b"\x00" * 6).decode("ascii")},
+    # count diferente do número de valores
+    {"count": 11},
+    {"count": -1},
+    {"count": True},
+    # dtype fora da lista, passo, data e grupos malformados
+    {"dtype": "<i4"},
+    {"dtype": "object"},
+    {"step_days": 0},
+    {"start": "01/10/2024"},
+    {"bands": {"lower": base64.b64encode(np.zeros(3, dtype=np.float32).tobytes()).decode("ascii")}},
+    {"members": []},
+])
+def test_validate_rejects_malformed_compact(change):
+    _, forecast = compact(10)
+    forecast.update(change)
+
+    with pytest.raises(ValueError):
+        validate_forecast(forecast)
+
+
+def test_validate_rejects_raw_string():
+    with pytest.raises(ValueError):
+        validate_forecast("string")
@@ -0,0 +1,235 @@
+import asyncio
+import time
+
+import pytest
+
+from utils import jobs
+from utils.admission import AdmissionController, AdmissionRejected
+from utils.inference import ForecastCancelled
+from utils.jobs import JobLimitError, JobManager, JobQueueFull
+
+
+@pytest.fixture(autouse=True)
+def fake_forecast(monkeypatch):
+    # Previsão sem modelo: um ponto a cada 10 ms, respeitando o cancelamento
+    async def stream_forecast(modelo, days, on_point, cancelled=None):
+        for day in range(days):
+            if cancelled is not None and cancelled():
+                raise ForecastCancelled()
+            on_point(day, float(day))
+            await asyncio.sleep(0.01)
+        return {"count": days}
+
+    monkeypatch.setattr(jobs, "stream_forecast", stream_forecast)
+
+
+def make_manager(slots: int = 4, **kwargs):
+    persisted = []
+
+    async def persist(job):
+        persisted.append(job.id)
+        return len(persisted)
+
+    admission = AdmissionController(global_rate=1000, global_burst=100000, user_rate=1, user_burst=1000,
+                                    max_concurrent=slots, queue_size=10, max_wait=1, max_days=1000)
+    options = dict(workers=1, queue_size=10, max_per_user=2, ttl=600, cleanup_interval=600, admission=admission)
+    options.update(kwargs)
+    return JobManager(persist, **options), persisted
+
+
+def tokens(manager, key):
+    bucket = manager.admission._users.get(key)
+    bucket._refill(time.monotonic())
+    return bucket.tokens
+
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condição não atingida a tempo")
+        await asyncio.sleep(0.005)
+
+
+def test_job_runs_and_persists():
+    async def scenario():
+        manager, persisted = make_manager()
+        job = manager.submit("lstm", 5, "user:1", user_id=1, username="ana")
+        await wait_for(lambda: job.finished)
+        await manager.stop()
+
+        assert job.status == "done"
+        assert [point["day"] for point in job.points] == [1, 2, 3, 4, 5]
+        assert job.result == {"count": 5}
+        assert job.predict_id == 1 and persisted == [job.id]
+
+    asyncio.run(scenario())
+
+
+def test_cancel_mid_run():
+    async def scenario():
+        manager, persisted = make_manager()
+        job = manager.submit("lstm", 500, "user:1", user_id=1)
+        await wait_for(lambda: len(job.points) >= 3)
+
+        manager.cancel(job.id)
+        await wait_for(lambda: job.finished)
+        await manager.stop()
+
+        assert job.status == "cancelled"
+        assert 3 <= len(job.points) < 500
+        assert persisted == []
+
+    asyncio.run(scenario())
+
+
+def test_cancel_queued_job_refunds_tokens():
+    async def scenario():
+        manager, _ = make_manager(workers=1)
+        running = manager.submit("lstm", 500, "a", user_id=1)
+        await wait_for(lambda: running.status == "running")
+        queued = manager.submit("lstm", 100, "b", user_id=2)
+        assert tokens(manager, "b") == pytest.approx(900, abs=1)
+
+        manager.cancel(queued.id)
+        assert queued.status == "cancelled"
+        assert tokens(manager, "b") == pytest.approx(1000, abs=1)
+
+        manager.cancel(running.id)
+        await manager.stop()
+        assert queued.points == []
+
+    asyncio.run(scenario())
+
+
+def test_per_user_limit_does_not_charge_tokens():
+    async def scenario():
+        manager, _ = make_manager(max_per_user=1)
+        manager.submit("lstm", 500, "a", user_id=1)
+        charged = tokens(manager, "a")
+
+        with pytest.raises(JobLimitError):
+            manager.submit("lstm", 100, "a", user_id=1)
+        assert tokens(manager, "a") == pytest.approx(charged, abs=1)
+        # O limite é por usuário
+        manager.submit("lstm", 10, "b", user_id=2)
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_per_user_limit_counts_by_client_key():
+    async def scenario():
+        manager, _ = make_manager(max_per_user=2)
+        # user_id do corpo muda a cada POST, mas a chave do cliente é a mesma
+        manager.submit("lstm", 500, "user:1", user_id=1)
+        manager.submit("lstm", 500, "user:1", user_id=2)
+        with pytest.raises(JobLimitError):
+            manager.submit("lstm", 500, "user:1", user_id=3)
+
+        # E usar o user_id de outra pessoa não esgota a cota dela
+        other = manager.submit("lstm", 10, "user:2", user_id=1)
+        assert manager.active_for("user:2") == 1 and other.user_id == 1
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_only_owner_sees_or_cancels_job():
+    async def scenario():
+        manager, _ = make_manager()
+        job = manager.submit("lstm", 500, "user:1", user_id=1)
+
+        assert manager.get(job.id, "user:2") is None
+        with pytest.raises(KeyError):
+            manager.cancel(job.id, "user:2")
+        assert not job.cancel_requested and job.status in ("queued", "running")
+
+        assert manager.get(job.id, "user:1") is job
+        manager.cancel(job.id, "user:1")
+        await wait_for(lambda: job.finished)
+        assert job.status == "cancelled"
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_does_not_charge_tokens():
+    async def scenario():
+        manager, _ = make_manager(queue_size=1, workers=1)
+        running = manager.submit("lstm", 500, "a", user_id=1)
+        await wait_for(lambda: running.status == "running")
+        queued = manager.submit("lstm", 10, "b", user_id=2)
+
+        with pytest.raises(JobQueueFull):
+            manager.submit("lstm", 10, "c", user_id=3)
+        assert manager.admission._users.get("c") is None
+
+        manager.cancel(queued.id)
+        manager.cancel(running.id)
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_rate_rejection_does_not_enqueue():
+    async def scenario():
+        manager, _ = make_manager()
+        manager.submit("lstm", 1000, "a", user_id=1)
+        jobs_before = len(manager._jobs)
+
+        # Bucket de "a" vazio: 1000 dias de novo passam do prazo de espera
+        with pytest.raises(AdmissionRejected):
+            manager.submit("lstm", 1000, "a", user_id=2)
+        assert len(manager._jobs) == jobs_before
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_evicted_after_ttl():
+    async def scenario():
+        manager, _ = make_manager(ttl=0.05, cleanup_interval=0.02)
+        job = manager.submit("lstm", 2, "user:1", user_id=1)
+        await wait_for(lambda: job.finished)
+        assert manager.get(job.id) is job
+
+        await wait_for(lambda: manager.get(job.id) is None)
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_jobs_share_inference_slots():
+    async def scenario():
+        manager, _ = make_manager(slots=1, workers=2)
+        first = manager.submit("lstm", 500, "user:1", user_id=1)
+        second = manager.submit("lstm", 500, "user:2", user_id=2)
+        await wait_for(lambda: first.status == "running" or second.status == "running")
+        await asyncio.sleep(0.05)
+
+        # Dois workers, mas uma vaga só: o outro job continua na fila
+        assert sorted([first.status, second.status]) == ["queued", "running"]
+        assert manager.admission._in_flight == 1
+        manager.cancel(first.id)
+        manager.cancel(second.id)
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_restarts_on_a_new_event_loop():
+    manager, _ = make_manager(slots=1, workers=2)
+
+    async def scenario():
+        first = manager.submit("lstm", 5, "user:1", user_id=1)
+        second = manager.submit("lstm", 5, "user:2", user_id=2)
+        await wait_for(lambda: first.finished and second.finished)
+        assert first.status == second.status == "done"
+        queued = manager.submit("lstm", 500, "user:3", user_id=3)
+        await manager.stop()
+        return queued
+
+    # Dois lifespans seguidos com o mesmo manager; o job que ficou na fila é cancelado no stop
+    assert asyncio.run(scenario()).status == "cancelled"
+    assert asyncio.run(scenario()).status == "cancelled"
@@ -0,0 +1,42 @@
+import asyncio
+
+from utils.logs import LogWriter
+
+
+def make_writer(**kwargs):
+    written = []
+
+    async def insert_many(rows):
+        written.extend(rows)
+
+    options = dict(batch_size=10, flush_interval=0.01)
+    options.update(kwargs)
+    return LogWriter(insert_many, **options), written
+
+
+def test_stop_flushes_queue():
+    async def scenario():
+        writer, written = make_writer(flush_interval=5)
+        for i in range(25):
+            await writer.enqueue({"action": i})
+        await writer.stop()
+        return written
+
+    assert [row["action"] for row in asyncio.run(scenario())] == list(range(25))
+
+
+def test_restarts_on_a_new_event_loop():
+    writer, written = make_writer()
+
+    async def scenario(action):
+        writer.start()
+        # Fila vazia: a task espera no get(), o que prende a fila ao loop atual
+        await asyncio.sleep(0.02)
+        assert not writer._task.done()
+        await writer.enqueue({"action": action})
+        await writer.stop()
+
+    # Dois lifespans seguidos com o mesmo writer
+    asyncio.run(scenario("primeiro"))
+    asyncio.run(scenario("segundo"))
+    assert [row["action"] for row in written] == ["primeiro", "segundo"]
@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.numpy_engine import NumpyModel, NumpyStatefulStep, file_sha256, source_hash, weights_path_for
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Saídas do Keras (model.predict do .pkl) para 4 janelas fixas de 60 passos, geradas
+# uma vez com TensorFlow: o teste roda sem ele. Regerar se os .pkl mudarem.
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "numpy_engine_reference.npz")
+MODELS = ("lstm", "gru")
+
+
+def model_path(name):
+    return os.path.join(BACKEND_DIR, "utils", name, f"model_{name}.pkl")
+
+
+@pytest.fixture(scope="module")
+def reference():
+    with np.load(REFERENCE) as data:
+        return {name: data[name] for name in data.files}
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_forward_matches_keras(name, reference):
+    model = NumpyModel.load(weights_path_for(model_path(name)))
+
+    outputs = model(reference["windows"])
+    assert outputs.dtype == np.float32 and outputs.shape == reference[name].shape
+    np.testing.assert_allclose(outputs, reference[name], rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_stateful_step_matches_windowed(name, reference):
+    model = NumpyModel.load(weights_path_for(model_path(name)))
+    windows = reference["windows"]
+
+    # Passo a passo carregando o estado dá o mesmo que a janela inteira
+    primed, states = NumpyStatefulStep(model).prime(windows)
+    np.testing.assert_allclose(primed, reference[name][:, 0], rtol=0, atol=1e-6)
+    assert len(states) == 2
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_weights_exported_from_current_pkl(name):
+    path = model_path(name)
+    assert source_hash(weights_path_for(path)) == file_sha256(path)
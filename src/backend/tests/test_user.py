@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from database.sql_client import create_sqlite_client
+from routers import user as user_router
+from schemas.user import UserCreate
+from utils.crypto import hash_password
+
+
+@pytest.fixture
+def logged(monkeypatch):
+    # Sem o LogWriter em segundo plano: só guarda o que seria logado
+    rows = []
+
+    async def create_log(username_log, action, user_id=None):
+        rows.append({"username_log": username_log, "action": action, "user_id": user_id})
+        return rows[-1:]
+
+    monkeypatch.setattr(user_router, "create_log", create_log)
+    return rows
+
+
+def login(tmp_path, username, password, users=()):
+    async def scenario():
+        client = await create_sqlite_client(str(tmp_path / "users.sqlite3"))
+        try:
+            for name, plain in users:
+                await client.table("users").insert({"username": name, "password": await hash_password(plain)}).execute()
+            return await user_router.login(UserCreate(username=username, password=password), supabase=client)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(scenario())
+
+
+def test_login_unknown_user_is_404(tmp_path, logged):
+    response = login(tmp_path, "ninguem", "x")
+
+    assert response.status_code == 404
+    assert logged == [{"username_log": "ninguem", "action": "Usuário não encontrado", "user_id": None}]
+
+
+def test_login_wrong_password_logs_user_id(tmp_path, logged):
+    response = login(tmp_path, "ana", "errada", users=[("ana", "certa")])
+
+    assert response.status_code == 400
+    assert logged[-1]["action"] == "Senha inválida" and logged[-1]["user_id"] == 1
@@ -0,0 +1,270 @@
+"""
+Controle de admissão das previsões.
+
+Cada previsão custa `dias × modelos` tokens, já que o laço autoregressivo cresce
+com o horizonte. Há um token bucket global e um por cliente; o pedido reserva os
+tokens dos dois e espera o tempo de reposição, se for preciso. Depois disso ainda
+precisa de uma das ADMISSION_MAX_CONCURRENT vagas de inferência. Os jobs
+(utils/jobs.py) ocupam as mesmas vagas, então esse é o limite total de
+inferências simultâneas.
+
+O cliente é o usuário do access token; sem token, o IP de origem. O user_id do
+corpo não serve de chave, já que qualquer um pode trocá-lo.
+
+Backpressure:
+- horizonte acima de MAX_FORECAST_DAYS (ou menor que 1), ou custo maior que a
+  capacidade dos buckets, é recusado de cara (400): nunca seria atendido;
+- se a espera prevista pelos buckets passa de ADMISSION_MAX_WAIT, o pedido é
+  recusado na hora (429 com Retry-After), sem ocupar a fila;
+- no máximo ADMISSION_QUEUE_SIZE pedidos esperando ao mesmo tempo;
+- quem não consegue vaga antes do prazo também recebe 429.
+Pedido recusado depois de reservar, ou cancelado antes de rodar (cliente que
+desconecta), tem os tokens devolvidos.
+
+Profundidade da fila, espera e recusas por motivo aparecem em /metrics.
+"""
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Depends, Query, Request
+from fastapi.requests import HTTPConnection
+from fastapi.responses import JSONResponse
+
+from utils.auth import get_optional_user, user_from_token
+from utils.cache import LRUTTLCache
+from utils.metrics import counter, gauge, histogram
+
+MAX_FORECAST_DAYS = int(os.getenv("MAX_FORECAST_DAYS", "365"))
+# Tokens = dias de previsão; taxa em dias por segundo e capacidade (rajada) em dias
+ADMISSION_GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", "500"))
+ADMISSION_GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", "5000"))
+ADMISSION_USER_RATE = float(os.getenv("ADMISSION_USER_RATE", "50"))
+ADMISSION_USER_BURST = float(os.getenv("ADMISSION_USER_BURST", "1000"))
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "50"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "5"))
+ADMISSION_MAX_USERS = int(os.getenv("ADMISSION_MAX_USERS", "10000"))
+
+
+class HorizonRejected(ValueError):
+    pass
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        # `now` pode ser anterior à criação do bucket (lido antes de buscá-lo no cache)
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, cost: float, now: float):
+        """Segundos até haver `cost` tokens (0 se já houver)."""
+        self._refill(now)
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+    def reserve(self, cost: float, now: float):
+        # Pode ficar negativo: a dívida é a espera de quem reservou e de quem vier depois
+        self._refill(now)
+        self.tokens -= cost
+
+    def refund(self, cost: float, now: float):
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+
+class AdmissionController:
+    def __init__(self, global_rate: float = ADMISSION_GLOBAL_RATE, global_burst: float = ADMISSION_GLOBAL_BURST,
+                 user_rate: float = ADMISSION_USER_RATE, user_burst: float = ADMISSION_USER_BURST,
+                 max_concurrent: int = ADMISSION_MAX_CONCURRENT, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 max_wait: float = ADMISSION_MAX_WAIT, max_days: int = MAX_FORECAST_DAYS,
+                 max_users: int = ADMISSION_MAX_USERS):
+        # Capacidade mínima de um pedido no horizonte máximo, senão ele nunca seria atendido
+        self.global_bucket = TokenBucket(global_rate, max(global_burst, max_days))
+        self.user_rate = user_rate
+        self.user_burst = max(user_burst, max_days)
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.max_days = max_days
+        self.max_cost = min(self.user_burst, self.global_bucket.capacity)
+        # Bucket ocioso por capacidade/taxa segundos já estaria cheio: pode ser descartado
+        self._users = LRUTTLCache(max_users, self.user_burst / user_rate)
+        self._slots = None
+        self._slots_loop = None
+        self._waiting = 0
+        self._in_flight = 0
+
+        gauge("admission_queue_depth", lambda: self._waiting)
+        gauge("admission_in_flight", lambda: self._in_flight)
+        gauge("admission_global_tokens", lambda: round(self.global_bucket.tokens, 1))
+        self._wait_ms = histogram("admission_wait_ms")
+        self._admitted = counter("admission_admitted")
+        self._rejected = {
+            reason: counter(f"admission_rejected_{reason}")
+            for reason in ("horizon", "cost", "rate", "queue", "deadline")
+        }
+
+    def check_horizon(self, days: int):
+        if not 1 <= days <= self.max_days:
+            self._rejected["horizon"].inc()
+            raise HorizonRejected(f"days deve estar entre 1 e {self.max_days}.")
+
+    def check_cost(self, days: int, models: int = 1):
+        """Valida horizonte e custo e devolve o custo em tokens (dias × modelos)."""
+        self.check_horizon(days)
+        cost = days * models
+        if cost > self.max_cost:
+            self._rejected["cost"].inc()
+            raise HorizonRejected(f"days × modelos = {cost} excede o máximo de {self.max_cost:g} por requisição.")
+        return cost
+
+    def _user_bucket(self, user):
+        bucket = self._users.get(user)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate, self.user_burst)
+        self._users.set(user, bucket)
+        return bucket
+
+    def reserve(self, user, cost: float):
+        """
+        Reserva `cost` tokens nos buckets global e do usuário e devolve quantos
+        segundos o pedido deve esperar. Recusa se a espera passar do prazo.
+        """
+        now = time.monotonic()
+        user_bucket = self._user_bucket(user)
+        wait = max(user_bucket.wait_time(cost, now), self.global_bucket.wait_time(cost, now))
+        if wait > self.max_wait:
+            self._rejected["rate"].inc()
+            raise AdmissionRejected("rate", wait, "Limite de previsões atingido, tente novamente mais tarde.")
+        user_bucket.reserve(cost, now)
+        self.global_bucket.reserve(cost, now)
+        return wait
+
+    def refund(self, user, cost: float):
+        """Devolve os tokens de um pedido reservado que não chegou a rodar."""
+        now = time.monotonic()
+        user_bucket = self._users.get(user)
+        if user_bucket is not None:
+            user_bucket.refund(cost, now)
+        self.global_bucket.refund(cost, now)
+
+    def _bind_loop(self):
+        # O Semaphore fica preso ao event loop em que alguém esperou por ele; um loop
+        # novo (outro lifespan, TestClient reiniciado) recebe vagas e contadores novos
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._slots_loop = loop
+            self._waiting = 0
+            self._in_flight = 0
+
+    async def _acquire_slot(self, timeout: float):
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return True
+        if timeout <= 0:
+            return False
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    @asynccontextmanager
+    async def _hold(self):
+        # Chamado com a vaga já adquirida; libera ao sair
+        self._admitted.inc()
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Vaga de inferência sem prazo nem tokens, para os jobs (que já reservaram no submit)."""
+        self._bind_loop()
+        await self._slots.acquire()
+        async with self._hold():
+            yield
+
+    @asynccontextmanager
+    async def admit(self, user, days: int, models: int = 1):
+        """Segura uma vaga de inferência para `days` dias de `models` modelos."""
+        cost = self.check_cost(days, models)
+        self._bind_loop()
+        if self._waiting >= self.queue_size:
+            self._rejected["queue"].inc()
+            raise AdmissionRejected("queue", self.max_wait, "Fila de previsões cheia, tente novamente mais tarde.")
+
+        start = time.monotonic()
+        wait = self.reserve(user, cost)
+        self._waiting += 1
+        acquired = False
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            acquired = await self._acquire_slot(self.max_wait - (time.monotonic() - start))
+        finally:
+            self._waiting -= 1
+            if not acquired:
+                # Prazo vencido ou cancelado na espera (cliente desconectou): nada rodou
+                self.refund(user, cost)
+        self._wait_ms.observe((time.monotonic() - start) * 1000)
+        if not acquired:
+            self._rejected["deadline"].inc()
+            raise AdmissionRejected("deadline", self.max_wait, "Servidor ocupado, tente novamente mais tarde.")
+
+        async with self._hold():
+            yield
+
+
+def _key(user, connection: HTTPConnection):
+    if user is not None:
+        return f"user:{user['id']}"
+    return f"ip:{connection.client.host if connection.client else 'unknown'}"
+
+
+def client_key(request: Request, user: dict = Depends(get_optional_user)):
+    """Dependency com a chave dos buckets: usuário do token ou, sem token, o IP de origem."""
+    return _key(user, request)
+
+
+def stream_client_key(connection: HTTPConnection, access_token: Optional[str] = Query(None)):
+    """
+    Mesma chave de client_key para SSE e WebSocket. EventSource e WebSocket do
+    navegador não mandam o header Authorization, então o token também vale em ?access_token=.
+    """
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        token = access_token
+    return _key(user_from_token(token), connection)
+
+
+def rejected_response(error: AdmissionRejected):
+    return JSONResponse(
+        content={"error": str(error), "reason": error.reason},
+        status_code=429,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+admission = AdmissionController()
@@ -0,0 +1,39 @@
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError
+
+from utils.crypto import decode_token
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+def _claims_user(credentials: HTTPAuthorizationCredentials):
+    try:
+        claims = decode_token(credentials.credentials, "access")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado", headers={"WWW-Authenticate": "Bearer"})
+    return {"id": int(claims["sub"]), "username": claims["username"]}
+
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(_bearer)):
+    """Dependency que autentica pelo access token, só com as claims (sem ir ao banco)."""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Token ausente", headers={"WWW-Authenticate": "Bearer"})
+    return _claims_user(credentials)
+
+
+def user_from_token(token: Optional[str]):
+    """Usuário de um access token cru, ou None se faltar ou for inválido."""
+    if not token:
+        return None
+    try:
+        return _claims_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+    except HTTPException:
+        return None
+
+
+def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(_bearer)):
+    """Usuário do access token, ou None sem token válido. Para rotas que não exigem login."""
+    return user_from_token(credentials.credentials if credentials is not None else None)
@@ -0,0 +1,226 @@
+"""
+Backtest walk-forward dos modelos sobre toda a série histórica.
+
+Cada janela de `time_steps` fechamentos da série vira um ponto de partida: o
+modelo prevê os `horizon` dias seguintes de forma autoregressiva, como na
+previsão real, e o resultado é comparado com os fechamentos que de fato vieram.
+Todas as janelas de um modelo passam juntas pela inferência (em lotes de
+BACKTEST_BATCH_SIZE), e os modelos rodam em paralelo no executor de inferência.
+
+Métricas por horizonte (1..horizon dias à frente), em preço:
+MAE, RMSE, MAPE (%) e acerto de direção (%): se o modelo acertou o sinal da
+variação em relação ao último fechamento da janela.
+
+Normalização sem olhar o futuro: cada janela usa o min/max dos fechamentos até
+o fim dela (MinMaxScaler(0, 1) ajustado só com o que se sabia naquela data), e não
+o scaler da série inteira, que já conhece os preços que o backtest tenta prever.
+O resultado informa isso em "normalization". Os pesos dos modelos continuam os
+atuais, treinados uma vez sobre a série: essa parte do vazamento só sai com
+retreino por origem, que não é feito aqui.
+
+Os resultados ficam em cache por (modelo, versão do modelo, versão da série,
+horizon, stride). Cada execução fora do cache passa pelo controle de admissão
+(utils/admission.py) com custo horizon × lotes de janelas, e ocupa uma vaga de
+inferência enquanto roda.
+
+Uso, a partir de src/backend:
+    python -m utils.backtest [--models lstm gru] [--horizon 30] [--stride 1] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.admission import admission
+from utils.cache import LRUTTLCache
+from utils.executor import inference_executor
+from utils.inference import PRICE_DATA_PATH
+from utils.metrics import counter
+from utils.model_registry import MODEL_NAMES, TIME_STEPS, model_registry
+from utils.price_series import get_price_series
+from utils.rolling_forecast import rolling_forecast_batch
+from utils.singleflight import SingleFlight
+from utils.windows import sliding_windows
+
+BACKTEST_BATCH_SIZE = int(os.getenv("BACKTEST_BATCH_SIZE", "4096"))
+BACKTEST_MAX_HORIZON = int(os.getenv("BACKTEST_MAX_HORIZON", "90"))
+BACKTEST_CACHE_SIZE = int(os.getenv("BACKTEST_CACHE_SIZE", "32"))
+BACKTEST_CACHE_TTL = float(os.getenv("BACKTEST_CACHE_TTL", "86400"))
+
+backtest_cache = LRUTTLCache(BACKTEST_CACHE_SIZE, BACKTEST_CACHE_TTL)
+backtest_flights = SingleFlight("backtest_requests")
+cache_hits = counter("backtest_cache_hits")
+cache_misses = counter("backtest_cache_misses")
+
+
+def window_count(rows: int, horizon: int, time_steps: int = TIME_STEPS, stride: int = 1):
+    count = rows - time_steps - horizon + 1
+    if count < 1:
+        raise ValueError(f"A série precisa de pelo menos {time_steps + horizon} linhas para horizon={horizon}.")
+    return -(-count // stride)
+
+
+def walk_forward(closes, horizon: int, time_steps: int = TIME_STEPS, stride: int = 1):
+    """
+    Janelas em preço (n, time_steps, 1), fechamentos reais seguintes (n, horizon),
+    último fechamento de cada janela (n,) e min/max dos fechamentos até o fim de
+    cada janela (n,), para normalizar sem olhar o futuro. Janelas, alvos e
+    últimos fechamentos são views da série, sem cópia.
+    """
+    window_count(len(closes), horizon, time_steps, stride)  # valida o tamanho da série
+    count = len(closes) - time_steps - horizon + 1
+
+    windows = sliding_windows(closes[:count + time_steps - 1], time_steps, stride)
+    targets = sliding_window_view(closes[time_steps:], horizon)[::stride]
+    ends = slice(time_steps - 1, time_steps - 1 + count, stride)
+    last = closes[ends]
+    low = np.minimum.accumulate(closes)[ends]
+    high = np.maximum.accumulate(closes)[ends]
+    return windows, targets, last, (low, high)
+
+
+def horizon_metrics(predicted, actual, last):
+    errors = predicted - actual
+    abs_errors = np.abs(errors)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(actual != 0, abs_errors / np.abs(actual), np.nan)
+    hits = np.sign(predicted - last[:, None]) == np.sign(actual - last[:, None])
+
+    mae = abs_errors.mean(axis=0)
+    rmse = np.sqrt((errors ** 2).mean(axis=0))
+    mape = np.nanmean(ape, axis=0) * 100
+    direction = hits.mean(axis=0) * 100
+    return [
+        {
+            "horizon": day + 1,
+            "mae": round(float(mae[day]), 4),
+            "rmse": round(float(rmse[day]), 4),
+            "mape": round(float(mape[day]), 4),
+            "directional_accuracy": round(float(direction[day]), 2),
+        }
+        for day in range(len(mae))
+    ]
+
+
+def summarize(metrics):
+    return {
+        name: round(float(np.mean([row[name] for row in metrics])), 4)
+        for name in ("mae", "rmse", "mape", "directional_accuracy")
+    }
+
+
+def backtest_model(modelo: str, horizon: int, stride: int = 1, batch_size: int = BACKTEST_BATCH_SIZE):
+    # Executado dentro do pool de inferência (thread ou processo filho)
+    start = time.perf_counter()
+    series = get_price_series(PRICE_DATA_PATH)
+    model = model_registry.get(modelo)
+
+    closes = series.closes[:, 0]
+    windows, targets, last, (low, high) = walk_forward(closes, horizon, series.time_steps, stride)
+    # Como o MinMaxScaler: intervalo zero vira escala 1
+    span = np.where(high > low, high - low, 1.0)
+
+    predicted = np.empty((len(windows), horizon), dtype=np.float64)
+    for begin in range(0, len(windows), batch_size):
+        end = begin + batch_size
+        lo, sp = low[begin:end, None], span[begin:end, None]
+        scaled = ((windows[begin:end, :, 0] - lo) / sp).astype(np.float32)
+        predicted[begin:end] = rolling_forecast_batch(model, scaled, horizon) * sp + lo
+
+    metrics = horizon_metrics(predicted, targets, last)
+    return {
+        "model": modelo,
+        "windows": len(windows),
+        "normalization": "expanding_minmax",
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        "summary": summarize(metrics),
+        "metrics": metrics,
+    }
+
+
+def _versions(modelo: str):
+    series = get_price_series(PRICE_DATA_PATH)
+    return model_registry.get_entry(modelo).version, series.data_version, len(series.closes)
+
+
+async def _backtest(key, modelo: str, horizon: int, stride: int, client, batches: int):
+    if client is None:
+        result = await inference_executor.run(backtest_model, modelo, horizon, stride)
+    else:
+        # Cada lote é um laço autoregressivo de `horizon` passos
+        async with admission.admit(client, horizon, models=batches):
+            result = await inference_executor.run(backtest_model, modelo, horizon, stride)
+    backtest_cache.set(key, result)
+    return result
+
+
+async def backtest(modelo: str, horizon: int, stride: int = 1, client=None):
+    """`client` é a chave de admissão; None (CLI) roda sem passar pelo controle."""
+    if modelo not in MODEL_NAMES:
+        raise KeyError(modelo)
+
+    model_version, data_version, rows = await asyncio.to_thread(_versions, modelo)
+    key = (modelo, model_version, data_version, horizon, stride)
+    cached = backtest_cache.get(key)
+    if cached is not None:
+        cache_hits.inc()
+        return dict(cached, cached=True, data_version=data_version)
+
+    cache_misses.inc()
+    # Pedidos idênticos simultâneos compartilham a mesma execução
+    batches = -(-window_count(rows, horizon, TIME_STEPS, stride) // BACKTEST_BATCH_SIZE)
+    result = await backtest_flights.do(key, _backtest, key, modelo, horizon, stride, client, batches)
+    return dict(result, cached=False, data_version=data_version)
+
+
+async def run_backtest(models=MODEL_NAMES, horizon: int = 30, stride: int = 1, client=None):
+    """Backtest de vários modelos ao mesmo tempo; retorna {modelo: resultado}."""
+    if not 1 <= horizon <= BACKTEST_MAX_HORIZON:
+        raise ValueError(f"horizon deve estar entre 1 e {BACKTEST_MAX_HORIZON}.")
+    if stride < 1:
+        raise ValueError("stride deve ser positivo.")
+
+    models = list(dict.fromkeys(models))
+    unknown = [modelo for modelo in models if modelo not in MODEL_NAMES]
+    if unknown:
+        raise KeyError(unknown[0])
+    results = await asyncio.gather(*(backtest(modelo, horizon, stride, client) for modelo in models))
+    return dict(zip(models, results))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=list(MODEL_NAMES))
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--stride", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run_backtest(args.models, args.horizon, args.stride))
+    finally:
+        inference_executor.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    shown = sorted({h for h in (1, 7, 14, 30, args.horizon) if h <= args.horizon})
+    for modelo, result in results.items():
+        print(f"\n== {modelo}: {result['windows']} janelas, horizon {args.horizon}, {result['elapsed_ms']:.0f} ms")
+        print(f"{'dias':>5} {'MAE':>10} {'RMSE':>10} {'MAPE %':>8} {'direção %':>10}")
+        for row in result["metrics"]:
+            if row["horizon"] in shown:
+                print(f"{row['horizon']:>5} {row['mae']:>10.2f} {row['rmse']:>10.2f} "
+                      f"{row['mape']:>8.2f} {row['directional_accuracy']:>10.1f}")
+        summary = result["summary"]
+        print(f"{'média':>5} {summary['mae']:>10.2f} {summary['rmse']:>10.2f} "
+              f"{summary['mape']:>8.2f} {summary['directional_accuracy']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
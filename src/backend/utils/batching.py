@@ -0,0 +1,171 @@
+"""
+Micro-batching entre requisições de previsão do mesmo modelo.
+
+Requisições que chegam dentro de uma janela curta (FORECAST_BATCH_WINDOW_MS) são
+agrupadas e, a cada passo autoregressivo, todas as janelas vão num único tensor
+para o modelo: N usuários custam aproximadamente um forward por passo. Novas
+requisições entram no lote na fronteira de um passo, e cada uma sai do lote
+assim que completa os seus `days`.
+
+Fila e task de um batcher pertencem ao event loop em que foram criadas, então há
+um batcher por (loop, modelo). O lifespan do app chama stop_batchers() no
+shutdown; um loop novo (outro lifespan, TestClient reiniciado) cria os seus.
+"""
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from utils.metrics import histogram, counter
+from utils.model_registry import model_registry
+from utils.rolling_forecast import WindowRing, get_step
+
+BATCH_WINDOW_MS = float(os.getenv("FORECAST_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("FORECAST_MAX_BATCH_SIZE", "64"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class ForecastRequest:
+    def __init__(self, window, days: int, future):
+        self.ring = WindowRing(np.asarray(window, dtype=np.float32).reshape(1, -1))
+        self.days = days
+        self.future = future
+        self.predictions = np.empty(days, dtype=np.float32)
+        self.done = 0
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceBatcher:
+    def __init__(self, model_name: str, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch_size: int = MAX_BATCH_SIZE, executor=None):
+        self.model_name = model_name
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+        self._queue = None
+        self._task = None
+        self._batch_size = histogram(f"forecast_batch_size_{model_name}", BATCH_SIZE_BUCKETS)
+        self._queue_wait = histogram(f"forecast_queue_wait_ms_{model_name}")
+        self._steps = counter(f"forecast_batch_steps_{model_name}")
+
+    def _ensure_running(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, window, days: int):
+        """Enfileira uma janela normalizada e aguarda `days` previsões (ainda normalizadas)."""
+        future = asyncio.get_running_loop().create_future()
+        if days <= 0:
+            future.set_result(np.empty(0, dtype=np.float32))
+            return await future
+
+        self._ensure_running()
+        await self._queue.put(ForecastRequest(window, days, future))
+        return await future
+
+    def _drain(self, active):
+        while len(active) < self.max_batch_size and not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                self._queue_wait.observe((time.perf_counter() - request.enqueued_at) * 1000)
+                active.append(request)
+
+    async def _call(self, fn, *args):
+        if self.executor is not None:
+            return await self.executor.run(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def stop(self):
+        """Para a task do lote; requisições ainda pendentes são canceladas."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+
+    async def _run(self):
+        active = []
+        try:
+            while True:
+                active = [await self._queue.get()]
+                self._queue_wait.observe((time.perf_counter() - active[0].enqueued_at) * 1000)
+
+                # Janela curta para juntar requisições concorrentes antes do primeiro passo
+                await asyncio.sleep(self.window_ms / 1000)
+                self._drain(active)
+
+                try:
+                    # Pode recarregar o .pkl, então também roda fora do event loop
+                    step = get_step(await self._call(model_registry.get, self.model_name))
+                except Exception as e:
+                    for request in active:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                    continue
+
+                while active:
+                    # Requisições canceladas saem do lote sem afetar as demais
+                    active = [request for request in active if not request.future.cancelled()]
+                    if not active:
+                        break
+
+                    batch = np.empty((len(active), active[0].ring.time_steps, 1), dtype=np.float32)
+                    for i, request in enumerate(active):
+                        batch[i] = request.ring.window()[0]
+
+                    self._batch_size.observe(len(active))
+                    self._steps.inc()
+                    try:
+                        values = await self._call(step, batch)
+                    except Exception as e:
+                        for request in active:
+                            if not request.future.done():
+                                request.future.set_exception(e)
+                        break
+
+                    remaining = []
+                    for request, value in zip(active, values):
+                        request.predictions[request.done] = value
+                        request.done += 1
+                        request.ring.push(value)
+                        if request.done == request.days:
+                            if not request.future.done():
+                                request.future.set_result(request.predictions)
+                        else:
+                            remaining.append(request)
+                    active = remaining
+
+                    # Novas requisições entram na fronteira do passo
+                    self._drain(active)
+
+        except asyncio.CancelledError:
+            # stop(): quem espera o lote atual não fica pendurado
+            for request in active:
+                request.future.cancel()
+            raise
+
+_batchers = {}
+
+
+def get_batcher(model_name: str, executor=None):
+    """Batcher do modelo no event loop atual."""
+    loop = asyncio.get_running_loop()
+    # Loops já fechados sem passar por stop_batchers (ex.: asyncio.run de um script)
+    for key in [key for key in _batchers if key[0].is_closed()]:
+        del _batchers[key]
+    batcher = _batchers.get((loop, model_name))
+    if batcher is None:
+        batcher = _batchers[(loop, model_name)] = InferenceBatcher(model_name, executor=executor)
+    return batcher
+
+
+async def stop_batchers():
+    """Para e descarta os batchers do event loop atual (shutdown do app)."""
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _batchers if key[0] is loop]:
+        await _batchers.pop(key).stop()
@@ -1,14 +1,38 @@
+import asyncio
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 from dotenv import load_dotenv
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from utils.metrics import histogram
+
 load_dotenv('./.env')
 
-JWT_SECRET: str = os.environ.get('JWT_SECRET') or "secret"
-CRYPT_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Sem fallback: /users/me confia nas claims do token, então um segredo conhecido permitiria forjá-lo
+JWT_SECRET: str = os.environ.get('JWT_SECRET') or ""
+if not JWT_SECRET:
+    raise RuntimeError("JWT_SECRET não definido: configure a variável de ambiente (ou o .env) antes de iniciar.")
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "7"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# min_rounds marca hashes com custo abaixo de BCRYPT_ROUNDS para serem refeitos no login
+CRYPT_CONTEXT = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+# O bcrypt libera o GIL, então threads bastam; o limite evita que um pico de logins
+# ocupe todos os núcleos
+_hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+_hash_ms = histogram("password_hash_ms")
 
 def verify_password(plain_password, hashed_password):
     return CRYPT_CONTEXT.verify(plain_password, hashed_password)
@@ -16,6 +40,24 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return CRYPT_CONTEXT.hash(password)
 
+async def _run_in_pool(fn, *args):
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_pool, fn, *args)
+    finally:
+        _hash_ms.observe((time.perf_counter() - start) * 1000)
+
+async def hash_password(password):
+    """Versão de get_password_hash que não bloqueia o event loop."""
+    return await _run_in_pool(CRYPT_CONTEXT.hash, password)
+
+async def verify_and_update(plain_password, hashed_password):
+    """
+    Verifica a senha fora do event loop. Retorna (válida, novo_hash); novo_hash
+    só vem preenchido quando o hash guardado usa parâmetros desatualizados.
+    """
+    return await _run_in_pool(CRYPT_CONTEXT.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -26,4 +68,20 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm="HS256")
 
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+def create_token_pair(user: dict):
+    # As claims carregam id e username: o dependency de autenticação não consulta o banco
+    claims = {"sub": str(user["id"]), "username": user["username"]}
+    return {
+        "access_token": create_access_token({**claims, "type": "access"}, timedelta(minutes=ACCESS_TOKEN_MINUTES)),
+        "refresh_token": create_access_token({**claims, "type": "refresh"}, timedelta(days=REFRESH_TOKEN_DAYS)),
+        "token_type": "bearer",
+    }
+
+def decode_token(token: str, token_type: str = "access"):
+    """Valida assinatura, expiração e tipo do token. Lança JWTError se inválido."""
+    claims = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+    if claims.get("type") != token_type:
+        raise JWTError(f"Token do tipo {claims.get('type')}, esperado {token_type}")
+    return claims
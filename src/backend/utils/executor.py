@@ -0,0 +1,66 @@
+"""
+Executor dedicado à inferência, para que pandas/sklearn/Keras não rodem no event loop.
+
+INFERENCE_EXECUTOR=thread (padrão): pool de threads com INFERENCE_WORKERS threads;
+o micro-batching continua ativo e cada passo do lote roda numa dessas threads.
+
+INFERENCE_EXECUTOR=process: pool de processos (spawn) com INFERENCE_WORKERS processos,
+cada um com os modelos pré-carregados no initializer. A previsão inteira roda no
+processo filho, então o micro-batching não é usado nesse modo.
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.metrics import gauge
+
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+
+def _init_worker():
+    from utils.model_registry import model_registry
+    model_registry.load_all()
+
+
+class InferenceExecutor:
+    def __init__(self, kind: str = INFERENCE_EXECUTOR, workers: int = INFERENCE_WORKERS):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"INFERENCE_EXECUTOR inválido: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.pool = None
+        self._in_flight = 0
+        gauge("inference_in_flight", lambda: self._in_flight)
+
+    def start(self):
+        if self.pool is not None:
+            return
+        if self.kind == "process":
+            # spawn: fazer fork de um processo com TensorFlow já inicializado pode travar
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    async def run(self, fn, *args, **kwargs):
+        self.start()
+        self._in_flight += 1
+        try:
+            call = functools.partial(fn, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+        finally:
+            self._in_flight -= 1
+
+
+inference_executor = InferenceExecutor()
@@ -0,0 +1,66 @@
+"""
+Serialização em streaming para os endpoints de exportação.
+
+Cada página vinda do banco vira um pedaço da resposta e é descartada em seguida,
+então a memória não cresce com o tamanho da tabela. Todas as linhas trazem o id:
+se a exportação cair, basta repetir a chamada com `cursor=<último id recebido>`.
+"""
+import csv
+import io
+import json
+import traceback
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value):
+    # forecast_result é JSON; no CSV vai como texto JSON numa única célula
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def ndjson_chunks(pages):
+    async for rows in pages:
+        yield "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+
+
+async def csv_chunks(pages, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    async for rows in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row.get(column)) for column in columns] for row in rows)
+        yield buffer.getvalue()
+
+
+async def _guarded(chunks, table):
+    # Depois do primeiro byte o status já foi enviado: em caso de erro só resta interromper
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception:
+        print(f"Exportação de {table} interrompida: {traceback.format_exc()}")
+        raise
+
+
+def export_response(pages, table: str, columns, export_format: str):
+    if export_format == "csv":
+        chunks = csv_chunks(pages, columns)
+    else:
+        chunks = ndjson_chunks(pages)
+
+    return StreamingResponse(
+        _guarded(chunks, table),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{export_format}"'},
+    )
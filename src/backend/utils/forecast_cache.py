@@ -0,0 +1,78 @@
+"""
+Cache de previsões por (modelo, versão do modelo, versão da série de preços).
+
+Como a previsão é autoregressiva, a série guardada de N dias responde qualquer
+pedido de até N dias (prefixo), e um pedido maior continua a partir do dia N
+usando as últimas `time_steps` posições de janela + previsões como checkpoint.
+Quando o CSV ou o .pkl mudam, a versão muda e as entradas antigas do modelo são
+descartadas.
+"""
+import os
+import threading
+
+import numpy as np
+
+from utils.cache import LRUTTLCache
+from utils.metrics import counter
+
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", "128"))
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "3600"))
+
+
+class ForecastCache:
+    def __init__(self, maxsize: int = FORECAST_CACHE_SIZE, ttl: float = FORECAST_CACHE_TTL):
+        self._cache = LRUTTLCache(maxsize, ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = counter("forecast_cache_hits")
+        self.misses = counter("forecast_cache_misses")
+        self.resumes = counter("forecast_cache_resumes")
+        self.days_reused = counter("forecast_cache_days_reused")
+
+    def _check_version(self, modelo: str, version: tuple):
+        with self._lock:
+            if self._versions.get(modelo) != version:
+                self._versions[modelo] = version
+                self._cache.invalidate(lambda key: key[0] == modelo and key[1:] != version)
+
+    def lookup(self, modelo: str, version: tuple, days: int):
+        """
+        Retorna (previsões em cache, quantos dias ainda faltam calcular).
+        As previsões são o prefixo já conhecido (pode ser vazio), normalizadas.
+        """
+        self._check_version(modelo, version)
+        cached = self._cache.get((modelo,) + version)
+        if cached is None:
+            self.misses.inc()
+            return np.empty(0, dtype=np.float32), days
+
+        if len(cached) >= days:
+            self.hits.inc()
+            self.days_reused.inc(days)
+            return cached[:days], 0
+
+        self.resumes.inc()
+        self.days_reused.inc(len(cached))
+        return cached, days - len(cached)
+
+    def store(self, modelo: str, version: tuple, predictions):
+        key = (modelo,) + version
+        current = self._cache.get(key)
+        if current is None or len(predictions) > len(current):
+            predictions = np.asarray(predictions, dtype=np.float32)
+            predictions.flags.writeable = False
+            self._cache.set(key, predictions)
+
+    def clear(self):
+        self._cache.clear()
+
+
+def resume_window(window, cached):
+    # Checkpoint: as últimas `time_steps` posições de janela original + previsões já feitas
+    window = np.asarray(window, dtype=np.float32).reshape(-1)
+    if len(cached) == 0:
+        return window
+    return np.concatenate([window, cached])[-len(window):]
+
+
+forecast_cache = ForecastCache()
@@ -0,0 +1,139 @@
+"""
+Formato compacto do forecast_result.
+
+Em vez de uma lista de {"date", "predicted_value"} com a data repetida em cada
+dia, guardamos a data inicial, o passo em dias e os valores em float32
+little-endian codificados em base64:
+
+    {"start": "2024-10-01 17:00:00", "step_days": 1, "count": 90,
+     "dtype": "<f4", "values": "<base64>"}
+
+A lista de objetos só é montada quando pedida (expand_forecast), e só para o
+trecho solicitado. Linhas antigas, ainda no formato de lista, continuam aceitas.
+Valores vindos de fora (PUT /predicts/update) passam por validate_forecast.
+
+Previsões de ensemble usam o mesmo formato para a série combinada e acrescentam,
+com o mesmo start/count, as faixas ("bands": {"lower": ..., "upper": ...}) e a
+série de cada modelo ("members": {"lstm": ..., "gru": ...}), também em base64.
+"""
+import base64
+from datetime import datetime, timedelta
+
+import numpy as np
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+DTYPE = "<f4"
+DTYPES = ("<f4", "<f8")
+
+
+def _encode_values(values):
+    return base64.b64encode(np.asarray(values, dtype=DTYPE).reshape(-1).tobytes()).decode("ascii")
+
+
+def _decode(encoded: str, dtype: str = DTYPE):
+    return np.frombuffer(base64.b64decode(encoded), dtype=dtype)
+
+
+def encode_forecast(values, start: datetime, step_days: int = 1, bands: dict = None, members: dict = None):
+    values = np.asarray(values, dtype=DTYPE).reshape(-1)
+    forecast = {
+        "start": start.strftime(DATE_FORMAT),
+        "step_days": step_days,
+        "count": int(len(values)),
+        "dtype": DTYPE,
+        "values": _encode_values(values),
+    }
+    if bands:
+        forecast["bands"] = {name: _encode_values(band) for name, band in bands.items()}
+    if members:
+        forecast["members"] = {name: _encode_values(member) for name, member in members.items()}
+    return forecast
+
+
+def is_compact(forecast):
+    return isinstance(forecast, dict) and "values" in forecast and "start" in forecast
+
+
+def decode_values(forecast):
+    return _decode(forecast["values"], forecast.get("dtype", DTYPE))
+
+
+def _check_series(encoded, dtype: str, count: int, name: str):
+    try:
+        series = _decode(encoded, dtype)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"forecast_result.{name} não é base64 de {dtype} válido.") from e
+    if len(series) != count:
+        raise ValueError(f"forecast_result.{name} tem {len(series)} valores, esperado {count}.")
+
+
+def validate_forecast(forecast):
+    """
+    Confere que o forecast é o formato compacto ou a lista antiga de
+    {"date", "predicted_value"}. Qualquer outra coisa lança ValueError, em vez
+    de ser gravada e aparecer depois como previsão vazia.
+    """
+    if isinstance(forecast, list):
+        for i, item in enumerate(forecast):
+            if (not isinstance(item, dict) or not isinstance(item.get("date"), str)
+                    or not isinstance(item.get("predicted_value"), (int, float))
+                    or isinstance(item.get("predicted_value"), bool)):
+                raise ValueError(f"forecast_result[{i}] deve ter 'date' (texto) e 'predicted_value' (número).")
+        return forecast
+
+    if not is_compact(forecast):
+        raise ValueError("forecast_result deve ser o formato compacto ou uma lista de {date, predicted_value}.")
+
+    dtype = forecast.get("dtype", DTYPE)
+    count = forecast.get("count")
+    step_days = forecast.get("step_days", 1)
+    if dtype not in DTYPES:
+        raise ValueError(f"forecast_result.dtype deve ser um de {', '.join(DTYPES)}.")
+    if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+        raise ValueError("forecast_result.count deve ser um inteiro não negativo.")
+    if not isinstance(step_days, int) or isinstance(step_days, bool) or step_days < 1:
+        raise ValueError("forecast_result.step_days deve ser um inteiro positivo.")
+    try:
+        datetime.strptime(forecast["start"], DATE_FORMAT)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"forecast_result.start deve estar no formato {DATE_FORMAT}.") from e
+
+    _check_series(forecast["values"], dtype, count, "values")
+    for group in ("bands", "members"):
+        series = forecast.get(group, {})
+        if not isinstance(series, dict):
+            raise ValueError(f"forecast_result.{group} deve ser um objeto.")
+        for name, encoded in series.items():
+            _check_series(encoded, dtype, count, f"{group}.{name}")
+    return forecast
+
+
+def forecast_length(forecast):
+    if is_compact(forecast):
+        return forecast["count"]
+    return len(forecast) if isinstance(forecast, list) else 0
+
+
+def expand_forecast(forecast, offset: int = 0, limit: int = None):
+    """Lista de {"date", "predicted_value"} para o trecho [offset, offset + limit)."""
+    if not is_compact(forecast):
+        items = forecast if isinstance(forecast, list) else []
+        return items[offset:] if limit is None else items[offset:offset + limit]
+
+    values = decode_values(forecast)
+    end = len(values) if limit is None else min(len(values), offset + limit)
+    start = datetime.strptime(forecast["start"], DATE_FORMAT)
+    step = timedelta(days=forecast.get("step_days", 1))
+    dtype = forecast.get("dtype", DTYPE)
+    bands = {name: _decode(band, dtype) for name, band in forecast.get("bands", {}).items()}
+    members = {name: _decode(member, dtype) for name, member in forecast.get("members", {}).items()}
+
+    items = []
+    for i in range(offset, end):
+        item = {"date": (start + step * i).strftime(DATE_FORMAT), "predicted_value": float(values[i])}
+        for name, band in bands.items():
+            item[name] = float(band[i])
+        if members:
+            item["members"] = {name: float(member[i]) for name, member in members.items()}
+        items.append(item)
+    return items
@@ -0,0 +1,226 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.batching import get_batcher
+from utils.executor import inference_executor
+from utils.forecast_cache import forecast_cache, resume_window
+from utils.forecast_codec import encode_forecast
+from utils.gru.PredictGru import main as predict_gru
+from utils.lstm.PredictLstm import main as predict_lstm
+from utils.model_registry import UTILS_DIR, model_registry
+from utils.price_series import get_price_series
+from utils.rolling_forecast import rolling_forecast
+from utils.singleflight import SingleFlight
+
+CSV_FILE_PATH = os.path.join(UTILS_DIR, 'eth_historical_data.csv')
+# CSV (padrão) ou price store binário: python -m utils.price_store convert <csv> <arquivo>.prices
+PRICE_DATA_PATH = os.getenv("PRICE_DATA_PATH", CSV_FILE_PATH)
+BATCHING_ENABLED = os.getenv("FORECAST_BATCHING", "1") == "1"
+
+PREDICTORS = {
+    "lstm": predict_lstm,
+    "gru": predict_gru,
+}
+
+ENSEMBLE_METHODS = ("mean", "weighted")
+
+forecast_flights = SingleFlight("forecast_requests")
+
+
+def forecast_start():
+    # Primeiro dia futuro às 17:00, passo diário
+    return (datetime.now() + timedelta(days=1)).replace(hour=17, minute=0, second=0, microsecond=0)
+
+
+def compact_forecast(future_prices, forecast_days: int):
+    # Formato compacto de utils/forecast_codec
+    return encode_forecast(future_prices[:forecast_days, 0], forecast_start())
+
+
+def to_prices(scaler, scaled):
+    """
+    Inverso do MinMaxScaler, (valor - min_) / scale_, já em float32 como no
+    formato compacto. Serve tanto para o vetor inteiro quanto para um valor só,
+    com o mesmo resultado: o ponto transmitido é igual ao que fica gravado.
+    """
+    scaled = np.asarray(scaled, dtype=np.float64)
+    return ((scaled - scaler.min_[0]) / scaler.scale_[0]).astype(np.float32)
+
+
+class ForecastCancelled(Exception):
+    pass
+
+
+def forecast_window(modelo: str, window, forecast_days: int, on_step=None):
+    # Executado dentro do pool de inferência (thread ou processo filho)
+    return rolling_forecast(model_registry.get(modelo), window, forecast_days, on_step=on_step)
+
+
+def _versions(modelo: str):
+    series = get_price_series(PRICE_DATA_PATH)
+    entry = model_registry.get_entry(modelo)
+    return series, (entry.version, series.data_version)
+
+
+def _model_version(modelo: str):
+    return model_registry.get_entry(modelo).version
+
+
+async def _compute(modelo: str, window, forecast_days: int):
+    if inference_executor.kind == "process" or not BATCHING_ENABLED:
+        return await inference_executor.run(forecast_window, modelo, window, forecast_days)
+    return await get_batcher(modelo, executor=inference_executor).submit(window, forecast_days)
+
+
+async def run_forecast(modelo: str, forecast_days: int):
+    if modelo not in PREDICTORS:
+        raise KeyError(modelo)
+
+    # Pedidos idênticos simultâneos compartilham o mesmo cálculo
+    return await forecast_flights.do((modelo, forecast_days), _run_forecast, modelo, forecast_days)
+
+
+async def _forecast_scaled(modelo: str, series, version: tuple, forecast_days: int):
+    # Prefixo em cache; se faltar horizonte, continua a partir do último dia calculado
+    cached, remaining = forecast_cache.lookup(modelo, version, forecast_days)
+    scaled = cached
+    if remaining:
+        window = resume_window(series.window, cached)
+        computed = await _compute(modelo, window, remaining)
+        scaled = np.concatenate([cached, computed])
+        forecast_cache.store(modelo, version, scaled)
+    return scaled
+
+
+async def _run_forecast(modelo: str, forecast_days: int):
+    # Fora do pool de inferência: no modo processo a série inteira seria serializada de volta
+    series, version = await asyncio.to_thread(_versions, modelo)
+    scaled = await _forecast_scaled(modelo, series, version, forecast_days)
+
+    future_prices = to_prices(series.scaler, scaled).reshape(-1, 1)
+    return compact_forecast(future_prices, forecast_days)
+
+
+async def stream_forecast(modelo: str, forecast_days: int, on_point, cancelled=None):
+    """
+    Mesma previsão de run_forecast, chamando on_point(dia, preço) a cada dia
+    produzido (dias já em cache saem de imediato). on_point pode ser chamado da
+    thread de inferência. Se cancelled() ficar verdadeiro, o laço para e levanta
+    ForecastCancelled. Com INFERENCE_EXECUTOR=process os pontos só saem no fim.
+    """
+    if modelo not in PREDICTORS:
+        raise KeyError(modelo)
+
+    series, version = await asyncio.to_thread(_versions, modelo)
+    scaler = series.scaler
+
+    def price(value):
+        return float(to_prices(scaler, value))
+
+    cached, remaining = forecast_cache.lookup(modelo, version, forecast_days)
+    for day, value in enumerate(cached):
+        on_point(day, price(value))
+
+    scaled = cached
+    if remaining:
+        offset = len(cached)
+
+        def on_step(day, values):
+            if cancelled is not None and cancelled():
+                raise ForecastCancelled()
+            on_point(offset + day, price(values[0]))
+
+        window = resume_window(series.window, cached)
+        if inference_executor.kind == "process":
+            computed = await inference_executor.run(forecast_window, modelo, window, remaining)
+            for day, value in enumerate(computed):
+                on_point(offset + day, price(value))
+        else:
+            computed = await inference_executor.run(forecast_window, modelo, window, remaining, on_step=on_step)
+        scaled = np.concatenate([cached, computed])
+        forecast_cache.store(modelo, version, scaled)
+
+    future_prices = to_prices(scaler, scaled).reshape(-1, 1)
+    return compact_forecast(future_prices, forecast_days)
+
+
+def ensemble_models(models):
+    """Modelos sem repetição, na ordem pedida; KeyError se algum não existir."""
+    models = list(dict.fromkeys(models))
+    unknown = [modelo for modelo in models if modelo not in PREDICTORS]
+    if unknown:
+        raise KeyError(", ".join(unknown))
+    return models
+
+
+def ensemble_overlaps():
+    """
+    Se vale rodar os modelos do ensemble ao mesmo tempo. Precisa de mais de um
+    núcleo e de um caminho que não fique preso ao GIL: executor de processos, ou
+    o engine numpy, cujas multiplicações liberam o GIL. Com Keras em threads o
+    passo de cada modelo é dominado por Python e os modelos juntos ficam mais
+    lentos que em sequência (365 dias, 1 núcleo: 5,99 s juntos contra 5,40 s).
+    """
+    if (os.cpu_count() or 1) < 2:
+        return False
+    return inference_executor.kind == "process" or model_registry.engine == "numpy"
+
+
+def ensemble_weights(models, method: str = "mean", weights: dict = None):
+    """Pesos normalizados na ordem de `models`."""
+    if method not in ENSEMBLE_METHODS:
+        raise ValueError(f"Método de ensemble inválido: {method}")
+    if method == "mean":
+        return np.full(len(models), 1 / len(models))
+
+    weights = weights or {}
+    missing = [modelo for modelo in models if modelo not in weights]
+    if missing:
+        raise ValueError(f"Pesos ausentes para: {', '.join(missing)}")
+    values = np.array([weights[modelo] for modelo in models], dtype=np.float64)
+    if (values < 0).any() or values.sum() <= 0:
+        raise ValueError("Pesos devem ser não negativos e com soma positiva.")
+    return values / values.sum()
+
+
+async def run_ensemble(models, forecast_days: int, method: str = "mean", weights: dict = None):
+    """
+    Previsão de vários modelos a partir da mesma série (CSV lido e scaler ajustado
+    uma vez). Retorna a série combinada no formato compacto, com faixas min/max
+    entre os modelos e a série de cada um.
+
+    Latência: perto da do modelo mais lento só quando ensemble_overlaps() (mais
+    de um núcleo, com engine numpy ou executor de processos). Fora disso os
+    modelos rodam em sequência e a latência é a soma das previsões, o que ainda
+    é melhor que rodá-los juntos disputando o GIL.
+    """
+    models = ensemble_models(models)
+    normalized = ensemble_weights(models, method, weights)
+
+    series = await asyncio.to_thread(get_price_series, PRICE_DATA_PATH)
+    versions = await asyncio.gather(*(asyncio.to_thread(_model_version, modelo) for modelo in models))
+    forecasts = [
+        _forecast_scaled(modelo, series, (model_version, series.data_version), forecast_days)
+        for modelo, model_version in zip(models, versions)
+    ]
+    if ensemble_overlaps():
+        scaled = await asyncio.gather(*forecasts)
+    else:
+        scaled = [await forecast for forecast in forecasts]
+
+    # Uma única inversão do scaler para todos os modelos: (modelos, dias)
+    stacked = np.stack([values[:forecast_days] for values in scaled])
+    prices = to_prices(series.scaler, stacked).astype(np.float64)
+    combined = normalized @ prices
+
+    forecast = encode_forecast(
+        combined, forecast_start(),
+        bands={"lower": prices.min(axis=0), "upper": prices.max(axis=0)},
+        members=dict(zip(models, prices)),
+    )
+    forecast["method"] = method
+    forecast["weights"] = {modelo: round(float(weight), 6) for modelo, weight in zip(models, normalized)}
+    return forecast
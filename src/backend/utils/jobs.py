@@ -0,0 +1,265 @@
+"""
+Previsões assíncronas em jobs.
+
+submit() só registra o job numa fila limitada (JOB_QUEUE_SIZE) e devolve o id;
+JOB_WORKERS tasks consomem a fila e rodam a previsão com stream_forecast, que
+entrega cada dia produzido. Os pontos ficam em job.points e quem acompanha o
+job (polling, SSE ou WebSocket) espera por job.wait_change().
+
+O dono do job é a chave do cliente (utils.admission.client_key: usuário do
+token ou IP), nunca o user_id do corpo, que qualquer um pode trocar; o user_id
+só vai para a linha gravada em `predict`. Só o dono consulta ou cancela o job.
+
+Limites: no máximo JOB_MAX_PER_USER jobs ativos (na fila ou rodando) por
+cliente. Os tokens do controle de admissão (utils/admission.py) são reservados
+no submit, só depois dos limites próprios dos jobs passarem, e devolvidos se o
+job for cancelado antes de rodar. Para rodar, o job ocupa uma das mesmas vagas
+de inferência das previsões síncronas. Jobs terminados ficam disponíveis por
+JOB_TTL segundos e depois são removidos. Ao terminar, o resultado é entregue a `persist` (o router grava a
+linha em `predict`).
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import timedelta
+
+from utils.admission import AdmissionController, admission as default_admission
+from utils.forecast_codec import DATE_FORMAT
+from utils.inference import ForecastCancelled, forecast_start, stream_forecast
+from utils.metrics import counter, gauge
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "2"))
+JOB_TTL = float(os.getenv("JOB_TTL", "600"))
+JOB_CLEANUP_INTERVAL = float(os.getenv("JOB_CLEANUP_INTERVAL", "60"))
+
+ACTIVE = ("queued", "running")
+
+
+class JobLimitError(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class ForecastJob:
+    def __init__(self, modelo: str, days: int, key, user_id: int = None, username: str = None):
+        self.id = uuid.uuid4().hex
+        self.modelo = modelo
+        self.days = days
+        self.key = key
+        self.user_id = user_id
+        self.username = username
+        self.status = "queued"
+        self.points = []
+        self.result = None
+        self.error = None
+        self.predict_id = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self.cost = 0
+        self.not_before = 0.0
+        self._start = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status not in ACTIVE
+
+    def _notify(self):
+        # Acorda todos que esperam a mudança atual; os próximos esperam um Event novo
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_change(self, timeout: float = None):
+        """True se o job mudou (ponto novo ou status) dentro do timeout."""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def add_point(self, day: int, value: float):
+        if day < len(self.points):
+            return
+        date = self._start + timedelta(days=day)
+        self.points.append({"day": day + 1, "date": date.strftime(DATE_FORMAT), "predicted_value": value})
+        self._notify()
+
+    def set_status(self, status: str, error: str = None):
+        self.status = status
+        self.error = error
+        if status == "running":
+            self.started_at = time.time()
+        elif status not in ACTIVE:
+            self.finished_at = time.time()
+        self._notify()
+
+    def info(self, offset: int = 0, limit: int = None):
+        points = self.points[offset:] if limit is None else self.points[offset:offset + limit]
+        return {
+            "job_id": self.id,
+            "model": self.modelo,
+            "status": self.status,
+            "days": self.days,
+            "progress": len(self.points),
+            "user_id": self.user_id,
+            "predict_id": self.predict_id,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "points": points,
+        }
+
+
+class JobManager:
+    def __init__(self, persist, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE,
+                 max_per_user: int = JOB_MAX_PER_USER, ttl: float = JOB_TTL,
+                 cleanup_interval: float = JOB_CLEANUP_INTERVAL,
+                 admission: AdmissionController = default_admission):
+        self.persist = persist
+        self.admission = admission
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self._jobs = {}
+        self._queue = None
+        self._tasks = []
+
+        gauge("job_queue_depth", lambda: self._queue.qsize() if self._queue is not None else 0)
+        gauge("jobs_running", lambda: sum(job.status == "running" for job in self._jobs.values()))
+        self._submitted = counter("jobs_submitted")
+        self._rejected = counter("jobs_rejected")
+        self._finished = {status: counter(f"jobs_{status}") for status in ("done", "failed", "cancelled")}
+
+    def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+            self._tasks.append(loop.create_task(self._cleanup()))
+
+    async def stop(self):
+        # Jobs ainda ativos são cancelados; o laço de inferência para no próximo dia
+        for job in self._jobs.values():
+            if job.status in ACTIVE:
+                job.cancel_requested = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Quem ficou na fila não roda mais; a fila é do event loop atual e o próximo start() cria outra
+        for job in list(self._jobs.values()):
+            if job.status == "queued":
+                self.cancel(job.id)
+        self._queue = None
+
+    def active_for(self, key):
+        return sum(1 for job in self._jobs.values() if job.key == key and job.status in ACTIVE)
+
+    def submit(self, modelo: str, days: int, key, user_id: int = None, username: str = None):
+        """
+        Enfileira o job do cliente `key`, que conta para o limite de jobs ativos e
+        para os buckets de admissão. Lança HorizonRejected, JobLimitError,
+        JobQueueFull ou AdmissionRejected; em nenhum desses casos os tokens ficam consumidos.
+        """
+        self.start()
+        cost = self.admission.check_cost(days)
+        if self.active_for(key) >= self.max_per_user:
+            self._rejected.inc()
+            raise JobLimitError(f"Limite de {self.max_per_user} jobs ativos por usuário atingido.")
+        if self._queue.full():
+            self._rejected.inc()
+            raise JobQueueFull("Fila de jobs cheia, tente novamente mais tarde.")
+
+        job = ForecastJob(modelo, days, key, user_id, username)
+        # Última checagem: se os buckets recusarem, nada foi enfileirado nem reservado
+        wait = self.admission.reserve(key, cost)
+        job.cost = cost
+        job.not_before = time.monotonic() + wait
+        # Sem await desde a checagem de full(): o put não falha
+        self._queue.put_nowait(job)
+        self._jobs[job.id] = job
+        self._submitted.inc()
+        return job
+
+    def get(self, job_id: str, key=None):
+        """Job pelo id; com `key`, None também se o job for de outro cliente."""
+        job = self._jobs.get(job_id)
+        if job is None or (key is not None and job.key != key):
+            return None
+        return job
+
+    def cancel(self, job_id: str, key=None):
+        job = self.get(job_id, key)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status == "queued":
+            # Não chegou a rodar: os tokens voltam para o cliente
+            self.admission.refund(job.key, job.cost)
+            self._finish(job, "cancelled")
+        elif job.status == "running":
+            job.cancel_requested = True
+        return job
+
+    def _finish(self, job, status: str, error: str = None):
+        job.set_status(status, error)
+        self._finished[status].inc()
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.status != "queued":
+                continue
+            # Espera a reposição dos buckets, como o admit() das previsões síncronas
+            delay = job.not_before - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with self.admission.slot():
+                # Pode ter sido cancelado enquanto esperava a vaga
+                if job.status == "queued":
+                    await self._run(job)
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        job._start = forecast_start()
+        job.set_status("running")
+
+        def on_point(day, value):
+            # Chamado da thread de inferência: o job só é alterado no event loop
+            loop.call_soon_threadsafe(job.add_point, day, value)
+
+        try:
+            job.result = await stream_forecast(job.modelo, job.days, on_point, lambda: job.cancel_requested)
+            job.predict_id = await self.persist(job)
+        except ForecastCancelled:
+            self._finish(job, "cancelled")
+            return
+        except asyncio.CancelledError:
+            self._finish(job, "cancelled")
+            raise
+        except Exception as e:
+            print(f"Job {job.id} falhou: {e}")
+            self._finish(job, "failed", str(e))
+            return
+        self._finish(job, "done")
+
+    async def _cleanup(self):
+        while True:
+            await asyncio.sleep(self.cleanup_interval)
+            cutoff = time.time() - self.ttl
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,158 @@
+"""
+Gravação assíncrona dos logs de auditoria.
+
+create_log apenas enfileira a linha; uma task em segundo plano junta as linhas e
+faz inserts em lote quando atinge LOG_BATCH_SIZE linhas ou LOG_FLUSH_INTERVAL
+segundos. Se a fila enche, LOG_OVERFLOW_POLICY decide: "drop_oldest" (padrão),
+"drop_newest" ou "block". Se o banco estiver fora e LOG_SPOOL_PATH estiver
+definido, o lote vai para um arquivo JSON Lines e é reenviado no próximo flush
+bem-sucedido.
+"""
+import asyncio
+import json
+import os
+import time
+
+from utils.metrics import counter, gauge, histogram
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "100"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop_oldest")
+LOG_SPOOL_PATH = os.getenv("LOG_SPOOL_PATH", "")
+
+
+class LogWriter:
+    def __init__(self, insert_many, queue_size: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, overflow_policy: str = LOG_OVERFLOW_POLICY,
+                 spool_path: str = LOG_SPOOL_PATH):
+        if overflow_policy not in ("drop_oldest", "drop_newest", "block"):
+            raise ValueError(f"LOG_OVERFLOW_POLICY inválida: {overflow_policy}")
+        self.insert_many = insert_many
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.spool_path = spool_path
+        self._queue = None
+        self._task = None
+        self._closing = False
+
+        gauge("log_queue_depth", lambda: self._queue.qsize() if self._queue is not None else 0)
+        self._flush_ms = histogram("log_flush_ms")
+        self._written = counter("log_rows_written")
+        self._dropped = counter("log_rows_dropped")
+        self._spooled = counter("log_rows_spooled")
+        self._errors = counter("log_flush_errors")
+
+    def start(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def enqueue(self, row: dict):
+        self.start()
+        if self.overflow_policy == "block":
+            await self._queue.put(row)
+            return
+
+        if self._queue.full():
+            self._dropped.inc()
+            if self.overflow_policy == "drop_newest":
+                return
+            self._queue.get_nowait()
+        self._queue.put_nowait(row)
+
+    def _take_batch(self, batch):
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        while True:
+            if self._closing and self._queue.empty():
+                return
+            try:
+                batch = [await asyncio.wait_for(self._queue.get(), self.flush_interval)]
+            except asyncio.TimeoutError:
+                continue
+            deadline = time.monotonic() + (0 if self._closing else self.flush_interval)
+
+            # Junta linhas até completar o lote ou vencer o intervalo
+            while len(batch) < self.batch_size:
+                self._take_batch(batch)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            await self.insert_many(batch)
+        except Exception as e:
+            self._errors.inc()
+            print(f"Erro ao gravar lote de {len(batch)} logs: {e}")
+            await self._spool(batch)
+            return
+        finally:
+            self._flush_ms.observe((time.perf_counter() - start) * 1000)
+
+        self._written.inc(len(batch))
+        await self._replay_spool()
+
+    def _write_spool(self, batch):
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+
+    def _take_spool(self):
+        if not os.path.exists(self.spool_path):
+            return []
+        with open(self.spool_path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        os.remove(self.spool_path)
+        return rows
+
+    async def _spool(self, batch):
+        if not self.spool_path:
+            self._dropped.inc(len(batch))
+            return
+        # O spool é usado justamente com o banco lento: o disco fica fora do event loop
+        await asyncio.to_thread(self._write_spool, batch)
+        self._spooled.inc(len(batch))
+
+    async def _replay_spool(self):
+        if not self.spool_path:
+            return
+
+        rows = await asyncio.to_thread(self._take_spool)
+
+        for i in range(0, len(rows), self.batch_size):
+            chunk = rows[i:i + self.batch_size]
+            try:
+                await self.insert_many(chunk)
+            except Exception as e:
+                print(f"Banco ainda indisponível para reenviar o spool de logs: {e}")
+                await self._spool(rows[i:])
+                return
+            self._written.inc(len(chunk))
+
+    async def stop(self, timeout: float = 30.0):
+        """Grava o que ainda está na fila e encerra a task."""
+        if self._task is None:
+            return
+        # Sem cancelar no meio de um insert: a task esvazia a fila e termina sozinha
+        self._closing = True
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            print(f"Flush dos logs excedeu {timeout}s; {self._queue.qsize()} linhas descartadas")
+        # A fila fica presa ao event loop atual; o próximo start() (outro lifespan) cria outra
+        self._task = None
+        self._queue = None
+        self._closing = False
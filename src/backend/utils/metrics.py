@@ -0,0 +1,92 @@
+import bisect
+import threading
+
+DEFAULT_MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Counter:
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    def __init__(self, name: str, fn=None):
+        self.name = name
+        self.value = 0
+        self._fn = fn
+
+    def set(self, value):
+        self.value = value
+
+    def snapshot(self):
+        return self._fn() if self._fn is not None else self.value
+
+
+class Histogram:
+    """Histograma de buckets fixos (limite superior inclusivo) com contagem e soma."""
+
+    def __init__(self, name: str, buckets=DEFAULT_MS_BUCKETS):
+        self.name = name
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {f"le_{bound}": count for bound, count in zip(self.buckets, self._counts)}
+            buckets["le_inf"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "sum": round(self._sum, 3),
+                "mean": round(self._sum / self._count, 3) if self._count else 0.0,
+                "max": round(self._max, 3),
+                "buckets": buckets,
+            }
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _get_or_create(name: str, factory):
+    metric = _metrics.get(name)
+    if metric is None:
+        with _metrics_lock:
+            metric = _metrics.setdefault(name, factory())
+    return metric
+
+
+def counter(name: str):
+    return _get_or_create(name, lambda: Counter(name))
+
+
+def gauge(name: str, fn=None):
+    return _get_or_create(name, lambda: Gauge(name, fn))
+
+
+def histogram(name: str, buckets=DEFAULT_MS_BUCKETS):
+    return _get_or_create(name, lambda: Histogram(name, buckets))
+
+
+def snapshot_all():
+    return {name: metric.snapshot() for name, metric in sorted(_metrics.items())}
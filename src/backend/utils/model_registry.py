@@ -0,0 +1,146 @@
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from utils.numpy_engine import NumpyModel, export_weights, file_sha256, source_hash, weights_path_for
+from utils.rolling_forecast import get_step, release_model
+
+UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_NAMES = ("lstm", "gru")
+TIME_STEPS = 60
+
+# keras: carrega o .pkl; numpy: carrega os pesos exportados em .npz (utils/numpy_engine.py),
+# sem importar TensorFlow
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "keras")
+# 0: modelos (e TensorFlow) só são carregados na primeira previsão
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "1") == "1"
+
+
+def model_path_for(modelo: str):
+    return os.path.join(UTILS_DIR, modelo, f"model_{modelo}.pkl")
+
+
+class ModelEntry:
+    def __init__(self, name: str, path: str, model, mtime_ns: int, size: int, warmup_ms: float):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.warmup_ms = warmup_ms
+        self.loaded_at = datetime.now()
+        self.memory_bytes = sum(int(np.asarray(w).nbytes) for w in model.get_weights())
+        self.parameters = sum(int(np.asarray(w).size) for w in model.get_weights())
+
+    @property
+    def version(self):
+        return f"{self.mtime_ns}-{self.size}"
+
+    def info(self):
+        return {
+            "model": self.name,
+            "path": self.path,
+            "loaded_at": self.loaded_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "version": self.version,
+            "file_size_bytes": self.size,
+            "memory_bytes": self.memory_bytes,
+            "parameters": self.parameters,
+            "warmup_ms": round(self.warmup_ms, 2),
+            "engine": "numpy" if isinstance(self.model, NumpyModel) else "keras",
+        }
+
+
+class ModelRegistry:
+    """
+    Mantém os modelos carregados uma única vez por processo.
+    O modelo é recarregado quando o .pkl muda em disco (mtime ou tamanho).
+    """
+
+    def __init__(self, model_names=MODEL_NAMES, time_steps: int = TIME_STEPS, engine: str = INFERENCE_ENGINE):
+        if engine not in ("keras", "numpy"):
+            raise ValueError(f"INFERENCE_ENGINE inválido: {engine}")
+        self.model_names = tuple(model_names)
+        self.time_steps = time_steps
+        self.engine = engine
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _warm_up(self, model):
+        # Primeira inferência traça a função compilada, para que a primeira requisição não pague por isso
+        start = time.perf_counter()
+        get_step(model)(np.zeros((1, self.time_steps, 1), dtype=np.float32))
+        return (time.perf_counter() - start) * 1000
+
+    def _read_model(self, path: str, stat):
+        if self.engine == "keras":
+            with open(path, "rb") as f:
+                return pickle.load(f)
+
+        # O .npz é regerado quando o hash do .pkl não bate com o gravado na exportação
+        # (mtime não serve: um checkout novo pode deixar o .npz mais velho que o .pkl).
+        # Só essa exportação importa o Keras
+        weights_path = weights_path_for(path)
+        sha256 = file_sha256(path)
+        if not os.path.exists(weights_path) or source_hash(weights_path) != sha256:
+            try:
+                with open(path, "rb") as f:
+                    export_weights(pickle.load(f), weights_path, sha256)
+                print(f"Pesos exportados para {weights_path}")
+            except ImportError:
+                # Imagem sem TensorFlow: usa o .npz que já existe, se houver
+                if not os.path.exists(weights_path):
+                    raise
+                print(f"Keras indisponível; usando {weights_path} sem reexportar")
+        return NumpyModel.load(weights_path)
+
+    def _load(self, name: str):
+        path = model_path_for(name)
+        stat = os.stat(path)
+
+        model = self._read_model(path, stat)
+
+        warmup_ms = self._warm_up(model)
+        entry = ModelEntry(name, path, model, stat.st_mtime_ns, stat.st_size, warmup_ms)
+        previous = self._entries.get(name)
+        self._entries[name] = entry
+        if previous is not None:
+            release_model(previous.model)
+        print(f"Modelo '{name}' carregado [{self.engine}] ({entry.memory_bytes} bytes, warm-up {warmup_ms:.1f} ms)")
+        return entry
+
+    def load_all(self):
+        # Modelos já carregados e atuais ficam como estão: workers criados por fork
+        # (serve.py) reaproveitam os do processo pai
+        for name in self.model_names:
+            try:
+                self.get_entry(name)
+            except Exception as e:
+                print(f"Falha ao carregar o modelo '{name}': {e}")
+
+    def get_entry(self, name: str):
+        if name not in self.model_names:
+            raise KeyError(name)
+
+        stat = os.stat(model_path_for(name))
+        entry = self._entries.get(name)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                entry = self._load(name)
+            return entry
+
+    def get(self, name: str):
+        return self.get_entry(name).model
+
+    def list_models(self):
+        return [entry.info() for entry in self._entries.values()]
+
+
+model_registry = ModelRegistry()
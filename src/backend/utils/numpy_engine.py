@@ -0,0 +1,276 @@
+"""
+Inferência dos modelos LSTM/GRU só com NumPy, sem importar TensorFlow/Keras.
+
+export_weights() lê o .pkl (aí sim com Keras) e grava um .npz com os pesos e a
+descrição das camadas; NumpyModel carrega esse .npz e refaz o forward pass:
+LSTM (portas i, f, c, o), GRU com reset_after (portas z, r, h e bias (2, 3u)),
+Dense e Dropout (identidade na inferência). A parte de entrada x @ W de todos os
+passos de tempo é uma única multiplicação; só o termo recorrente fica no laço.
+
+O .npz guarda o sha256 do .pkl de origem (source_sha256); o registry só
+reexporta quando o .pkl muda de conteúdo, não pelo mtime, que num checkout
+novo pode deixar o .npz "mais velho" que o .pkl.
+
+Em float32 a saída difere da do Keras em menos de 1e-5 no valor normalizado
+(medido em benchmarks/bench_numpy_engine.py).
+
+Uso, a partir de src/backend:
+    python -m utils.numpy_engine export lstm gru
+"""
+import argparse
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 0.5 * (np.tanh(0.5 * x) + 1.0),
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+}
+
+DTYPE = np.float32
+
+
+def weights_path_for(model_path: str):
+    return os.path.splitext(model_path)[0] + ".npz"
+
+
+def _activation(name: str):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Ativação não suportada: {name}")
+    return ACTIVATIONS[name]
+
+
+def file_sha256(path: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hash(path: str):
+    """sha256 do .pkl gravado no .npz por export_weights, ou None se não houver."""
+    with np.load(path) as data:
+        return str(data["source_sha256"]) if "source_sha256" in data.files else None
+
+
+def export_weights(model, path: str, source_sha256: str = None):
+    """Grava as camadas de um Sequential Keras (LSTM/GRU/Dense/Dropout) num .npz."""
+    layers, arrays = [], {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        if kind == "Dropout":
+            continue
+        if kind not in ("LSTM", "GRU", "Dense"):
+            raise ValueError(f"Camada não suportada: {kind}")
+        if kind == "GRU" and not config.get("reset_after", True):
+            raise ValueError("GRU sem reset_after não é suportada")
+        if config.get("go_backwards") or config.get("stateful"):
+            raise ValueError(f"{kind} com go_backwards/stateful não é suportada")
+
+        index = len(layers)
+        layers.append({
+            "type": kind.lower(),
+            "units": config["units"],
+            "activation": config.get("activation", "linear"),
+            "recurrent_activation": config.get("recurrent_activation"),
+            "return_sequences": config.get("return_sequences", False),
+        })
+        for name, weight in zip(("kernel", "recurrent_kernel", "bias") if kind != "Dense" else ("kernel", "bias"),
+                                layer.get_weights()):
+            arrays[f"{index}/{name}"] = np.asarray(weight, dtype=DTYPE)
+
+    if source_sha256 is not None:
+        arrays["source_sha256"] = np.array(source_sha256)
+    np.savez(path, layers=np.array(json.dumps(layers)), **arrays)
+    return path
+
+
+class _Recurrent(ABC):
+    def __init__(self, spec, arrays, index):
+        self.units = spec["units"]
+        self.return_sequences = spec["return_sequences"]
+        self.activation = _activation(spec["activation"])
+        self.recurrent_activation = _activation(spec["recurrent_activation"])
+        self.kernel = arrays[f"{index}/kernel"]
+        self.recurrent_kernel = arrays[f"{index}/recurrent_kernel"]
+        self.bias = arrays[f"{index}/bias"]
+
+    @abstractmethod
+    def initial_state(self, batch_size: int):
+        """Estado recorrente zerado para `batch_size` sequências."""
+
+    @abstractmethod
+    def input_projection(self, x):
+        """Termo de entrada x @ W (+ bias) de todos os passos de tempo."""
+
+    @abstractmethod
+    def cell(self, projected, state):
+        """Um passo da recorrência: devolve (saída h, novo estado)."""
+
+    def __call__(self, x):
+        batch, steps, _ = x.shape
+        # x @ W para todos os passos de uma vez: (batch, steps, n_portas * units)
+        projected = self.input_projection(x)
+        state = self.initial_state(batch)
+        outputs = np.empty((batch, steps, self.units), dtype=DTYPE) if self.return_sequences else None
+        for t in range(steps):
+            h, state = self.cell(projected[:, t], state)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
+
+
+class LSTMLayer(_Recurrent):
+    def initial_state(self, batch_size: int):
+        zeros = np.zeros((batch_size, self.units), dtype=DTYPE)
+        return zeros, zeros.copy()
+
+    def input_projection(self, x):
+        return x @ self.kernel + self.bias
+
+    def cell(self, projected, state):
+        h, c = state
+        z = projected + h @ self.recurrent_kernel
+        u = self.units
+        i = self.recurrent_activation(z[:, :u])
+        f = self.recurrent_activation(z[:, u:2 * u])
+        g = self.activation(z[:, 2 * u:3 * u])
+        o = self.recurrent_activation(z[:, 3 * u:])
+        c = f * c + i * g
+        h = o * self.activation(c)
+        return h, (h, c)
+
+
+class GRULayer(_Recurrent):
+    def initial_state(self, batch_size: int):
+        return np.zeros((batch_size, self.units), dtype=DTYPE)
+
+    def input_projection(self, x):
+        # reset_after: bias[0] soma na entrada e bias[1] no termo recorrente
+        return x @ self.kernel + self.bias[0]
+
+    def cell(self, projected, h):
+        u = self.units
+        inner = h @ self.recurrent_kernel + self.bias[1]
+        z = self.recurrent_activation(projected[:, :u] + inner[:, :u])
+        r = self.recurrent_activation(projected[:, u:2 * u] + inner[:, u:2 * u])
+        candidate = self.activation(projected[:, 2 * u:] + r * inner[:, 2 * u:])
+        h = z * h + (1 - z) * candidate
+        return h, h
+
+
+class DenseLayer:
+    def __init__(self, spec, arrays, index):
+        self.activation = _activation(spec["activation"])
+        self.kernel = arrays[f"{index}/kernel"]
+        self.bias = arrays[f"{index}/bias"]
+
+    def __call__(self, x):
+        return self.activation(x @ self.kernel + self.bias)
+
+
+_LAYERS = {"lstm": LSTMLayer, "gru": GRULayer, "dense": DenseLayer}
+
+
+class NumpyModel:
+    def __init__(self, layers):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            specs = json.loads(str(data["layers"]))
+            arrays = {name: data[name] for name in data.files if name not in ("layers", "source_sha256")}
+        return cls([_LAYERS[spec["type"]](spec, arrays, index) for index, spec in enumerate(specs)])
+
+    def get_weights(self):
+        weights = []
+        for layer in self.layers:
+            weights.extend(w for w in (layer.kernel, getattr(layer, "recurrent_kernel", None), layer.bias)
+                           if w is not None)
+        return weights
+
+    def __call__(self, x):
+        outputs = np.asarray(x, dtype=DTYPE)
+        for layer in self.layers:
+            outputs = layer(outputs)
+        return outputs
+
+    def predict(self, x, verbose=0):
+        return self(x)
+
+
+class NumpyStep:
+    """Equivalente ao CompiledStep de utils/rolling_forecast para o NumpyModel."""
+
+    def __init__(self, model, time_steps: int = None):
+        self.model = model
+
+    def __call__(self, windows):
+        return self.model(windows)[:, 0]
+
+
+class NumpyStatefulStep:
+    """Equivalente ao StatefulStep: um valor por passo, carregando o estado recorrente."""
+
+    def __init__(self, model, time_steps: int = None):
+        self.model = model
+        self._recurrent = [layer for layer in model.layers if isinstance(layer, _Recurrent)]
+        if not self._recurrent:
+            raise ValueError("Modelo não possui camadas recorrentes.")
+
+    def initial_states(self, batch_size: int):
+        return [layer.initial_state(batch_size) for layer in self._recurrent]
+
+    def _step(self, x, states):
+        outputs, new_states, index = x, [], 0
+        for layer in self.model.layers:
+            if isinstance(layer, _Recurrent):
+                outputs, state = layer.cell(layer.input_projection(outputs), states[index])
+                new_states.append(state)
+                index += 1
+            else:
+                outputs = layer(outputs)
+        return outputs, new_states
+
+    def prime(self, windows):
+        windows = np.asarray(windows, dtype=DTYPE).reshape(len(windows), -1)
+        states = self.initial_states(len(windows))
+        outputs = None
+        for t in range(windows.shape[1]):
+            outputs, states = self._step(windows[:, t:t + 1], states)
+        return outputs[:, 0], states
+
+    def __call__(self, values, states):
+        outputs, states = self._step(np.asarray(values, dtype=DTYPE).reshape(-1, 1), states)
+        return outputs[:, 0], states
+
+
+def main():
+    import pickle
+
+    from utils.model_registry import model_path_for
+
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export")
+    export.add_argument("models", nargs="+")
+    args = parser.parse_args()
+
+    for name in args.models:
+        model_path = model_path_for(name)
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        path = export_weights(model, weights_path_for(model_path), file_sha256(model_path))
+        print(f"{name}: pesos exportados para {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import copy
+import io
+import os
+import threading
+
+import numpy as np
+
+from utils.price_store import PriceStore
+
+TIME_STEPS = 60
+
+
+def _new_scaler():
+    # sklearn (e scipy junto) só é importado na primeira carga da série, não no import do módulo
+    from sklearn.preprocessing import MinMaxScaler
+
+    return MinMaxScaler(feature_range=(0, 1))
+
+
+class PriceSeries:
+    """
+    Fotografia imutável da série de preços: valores brutos, scaler ajustado
+    e a última janela já normalizada, pronta para a inferência.
+    """
+
+    def __init__(self, closes, scaler, time_steps: int, version: tuple):
+        self.closes = closes
+        self.scaler = scaler
+        self.time_steps = time_steps
+        self.version = version
+
+        # Só a última janela é usada na previsão, então normalizamos apenas ela
+        self.window = scaler.transform(closes[-time_steps:]).reshape(1, time_steps, 1)
+        self.window.flags.writeable = False
+
+    @property
+    def data_version(self):
+        mtime_ns, size, rows = self.version
+        return f"{mtime_ns}-{size}-{rows}"
+
+
+class PriceSeriesCache:
+    """
+    Lê o CSV uma única vez e mantém o resultado em memória, usando mtime/tamanho
+    do arquivo como chave. Quando linhas são anexadas ao final do arquivo, apenas
+    os bytes novos são lidos e o scaler é atualizado com partial_fit.
+    """
+
+    def __init__(self, csv_file_path: str, time_steps: int = TIME_STEPS, column: str = "Close"):
+        self.csv_file_path = csv_file_path
+        self.time_steps = time_steps
+        self.column = column
+        self._lock = threading.Lock()
+        self._current = (None, None)
+        self._columns = None
+        self._offset = 0
+        self._last_line = b""
+        self._partial = False
+        self._buffer = np.empty((0, 1), dtype=np.float64)
+        self._rows = 0
+        self._scaler = None
+
+    def _append(self, values):
+        # Buffer com capacidade dobrada a cada estouro: anexar é O(1) amortizado
+        needed = self._rows + len(values)
+        if needed > len(self._buffer):
+            capacity = max(needed, 2 * len(self._buffer), 1024)
+            buffer = np.empty((capacity, 1), dtype=np.float64)
+            buffer[:self._rows] = self._buffer[:self._rows]
+            self._buffer = buffer
+        self._buffer[self._rows:needed, 0] = values
+        self._rows = needed
+
+    def _parse(self, data: bytes, header: bool):
+        import pandas as pd
+
+        if header:
+            df = pd.read_csv(io.BytesIO(data))
+        else:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=self._columns)
+
+        if self.column not in df.columns:
+            print(f"Column '{self.column}' is missing in the CSV file.")
+            raise ValueError(f"Arquivo CSV deve conter a coluna '{self.column}'.")
+
+        if header:
+            self._columns = list(df.columns)
+
+        values = pd.to_numeric(df[self.column], errors="coerce").dropna()
+        return values.to_numpy(dtype=np.float64)
+
+    def _complete(self, data: bytes):
+        # Considera apenas linhas terminadas em '\n'; uma linha parcial fica para a próxima leitura
+        end = data.rfind(b"\n") + 1
+        return data[:end]
+
+    def _rebuild(self, stat):
+        # Na releitura completa a última linha entra mesmo sem '\n' (CSV salvo sem quebra final)
+        with open(self.csv_file_path, "rb") as f:
+            data = f.read(stat.st_size)
+        self._partial = not data.endswith(b"\n")
+
+        values = self._parse(data, header=True)
+        if len(values) < self.time_steps:
+            raise ValueError(f"Arquivo CSV deve conter pelo menos {self.time_steps} linhas.")
+
+        self._rows = 0
+        self._buffer = np.empty((0, 1), dtype=np.float64)
+        self._append(values)
+        self._offset = len(data)
+        self._last_line = data[data.rfind(b"\n", 0, len(data) - 1) + 1:]
+
+        self._scaler = _new_scaler()
+        self._scaler.fit(self._buffer[:self._rows])
+
+    def _tail_is_unchanged(self, f):
+        # O(1): confere que a última linha conhecida continua no mesmo lugar
+        start = self._offset - len(self._last_line)
+        f.seek(start)
+        return f.read(len(self._last_line)) == self._last_line
+
+    def _update(self, stat):
+        # Sem bytes novos além do conhecido, o arquivo foi reescrito e não apenas anexado.
+        # Se a última linha lida não tinha '\n', o que vier depois pode completá-la: relê tudo
+        if self._scaler is None or self._partial or stat.st_size <= self._offset:
+            self._rebuild(stat)
+            return
+
+        with open(self.csv_file_path, "rb") as f:
+            if not self._tail_is_unchanged(f):
+                self._rebuild(stat)
+                return
+            f.seek(self._offset)
+            data = self._complete(f.read(stat.st_size - self._offset))
+
+        if not data:
+            return
+
+        values = self._parse(data, header=False)
+        self._offset += len(data)
+        self._last_line = data[data.rfind(b"\n", 0, len(data) - 1) + 1:]
+
+        if len(values):
+            # Cópia do scaler para não alterar fotografias que ainda estão em uso
+            scaler = copy.deepcopy(self._scaler)
+            scaler.partial_fit(values.reshape(-1, 1))
+            self._scaler = scaler
+            self._append(values)
+
+    def get(self):
+        if not os.path.exists(self.csv_file_path):
+            raise FileNotFoundError(f"Arquivo CSV não encontrado: {self.csv_file_path}")
+
+        stat = os.stat(self.csv_file_path)
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        current_key, snapshot = self._current
+        if current_key == stat_key:
+            return snapshot
+
+        with self._lock:
+            current_key, snapshot = self._current
+            if current_key != stat_key:
+                self._update(stat)
+                closes = self._buffer[:self._rows]
+                closes.flags.writeable = False
+                snapshot = PriceSeries(closes, self._scaler, self.time_steps, stat_key + (self._rows,))
+                self._current = (stat_key, snapshot)
+            return snapshot
+
+
+class PriceStoreCache:
+    """
+    Mesma interface do PriceSeriesCache, lendo do price store binário
+    (utils/price_store.py). Os fechamentos são uma fatia do memmap, sem parse
+    nem cópia; linhas anexadas só passam pelo partial_fit do scaler.
+    """
+
+    def __init__(self, store_path: str, time_steps: int = TIME_STEPS, column: str = "close"):
+        self.store_path = store_path
+        self.time_steps = time_steps
+        self.column = column
+        self._lock = threading.Lock()
+        self._current = (None, None)
+        self._rows = 0
+        self._scaler = None
+
+    def _update(self, store):
+        closes = store.column(self.column).reshape(-1, 1)
+        if len(closes) < self.time_steps:
+            raise ValueError(f"A série deve conter pelo menos {self.time_steps} linhas.")
+
+        # Menos linhas que antes: o arquivo foi recriado, então reajusta do zero
+        if self._scaler is None or store.rows < self._rows:
+            self._scaler = _new_scaler()
+            self._scaler.fit(closes)
+        elif store.rows > self._rows:
+            scaler = copy.deepcopy(self._scaler)
+            scaler.partial_fit(closes[self._rows:])
+            self._scaler = scaler
+        self._rows = store.rows
+        return closes
+
+    def get(self):
+        if not os.path.exists(self.store_path):
+            raise FileNotFoundError(f"Price store não encontrado: {self.store_path}")
+
+        stat = os.stat(self.store_path)
+        # O inode muda quando o arquivo cresce (regravado e trocado com os.replace)
+        stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        current_key, snapshot = self._current
+        if current_key == stat_key:
+            return snapshot
+
+        with self._lock:
+            current_key, snapshot = self._current
+            if current_key != stat_key:
+                store = PriceStore(self.store_path)
+                closes = self._update(store)
+                snapshot = PriceSeries(closes, self._scaler, self.time_steps,
+                                       (stat.st_mtime_ns, stat.st_size, store.rows))
+                self._current = (stat_key, snapshot)
+            return snapshot
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_price_series(data_path: str, time_steps: int = TIME_STEPS):
+    """Série de preços de um CSV ou, se o caminho terminar em .prices, do price store."""
+    key = (os.path.abspath(data_path), time_steps)
+    cache = _caches.get(key)
+    if cache is None:
+        cache_class = PriceStoreCache if data_path.endswith(".prices") else PriceSeriesCache
+        with _caches_lock:
+            cache = _caches.setdefault(key, cache_class(key[0], time_steps))
+    return cache.get()
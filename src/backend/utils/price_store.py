@@ -0,0 +1,244 @@
+"""
+Armazenamento binário colunar, só de anexação, para séries OHLCV.
+
+Layout do arquivo (little-endian):
+
+    [0:8)    magic b"PRCSTOR1"
+    [8:16)   rows      (uint64) linhas confirmadas
+    [16:24)  capacity  (uint64) linhas reservadas por coluna
+    [24:28)  tamanho do JSON de esquema (uint32)
+    [28:...) JSON {"columns": [[nome, dtype], ...]}
+    HEADER_SIZE em diante: uma região de capacity * 8 bytes por coluna
+
+Cada coluna é lida com np.memmap, então as últimas N linhas são uma fatia sem
+cópia nem parse. A anexação grava os valores primeiro e só depois atualiza
+`rows` no cabeçalho: um leitor nunca vê linha pela metade. Quando a capacidade
+acaba, o arquivo é regravado com o dobro de espaço e trocado com os.replace;
+leitores que já tinham o arquivo aberto continuam com a versão antiga.
+Um único processo deve escrever por vez (flock durante o append).
+
+Uso, a partir de src/backend:
+    python -m utils.price_store convert utils/eth_historical_data.csv utils/eth_historical_data.prices
+    python -m utils.price_store append utils/eth_historical_data.prices novos_candles.csv
+    python -m utils.price_store info utils/eth_historical_data.prices
+"""
+import argparse
+import fcntl
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"PRCSTOR1"
+HEADER_SIZE = 4096
+_FIXED = struct.Struct("<8sQQI")
+
+# Data em dias desde 1970-01-01; preços em float64; volume em int64
+COLUMNS = (
+    ("date", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("adj_close", "<f8"),
+    ("volume", "<i8"),
+)
+
+# Colunas do CSV do Yahoo Finance usado pelo projeto
+CSV_COLUMNS = {
+    "Date": "date",
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+
+CONVERT_CHUNK_ROWS = 1_000_000
+
+
+def _write_header(f, rows: int, capacity: int, columns):
+    schema = json.dumps({"columns": [list(column) for column in columns]}).encode()
+    if _FIXED.size + len(schema) > HEADER_SIZE:
+        raise ValueError("Esquema grande demais para o cabeçalho")
+    f.seek(0)
+    f.write(_FIXED.pack(MAGIC, rows, capacity, len(schema)) + schema)
+    f.write(b"\0" * (HEADER_SIZE - _FIXED.size - len(schema)))
+
+
+def _read_header(f):
+    f.seek(0)
+    magic, rows, capacity, schema_size = _FIXED.unpack(f.read(_FIXED.size))
+    if magic != MAGIC:
+        raise ValueError("Arquivo não é um price store")
+    columns = [tuple(column) for column in json.loads(f.read(schema_size))["columns"]]
+    return rows, capacity, columns
+
+
+class PriceStore:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.rows, self.capacity, self.columns = _read_header(f)
+        self._maps = {}
+
+    @classmethod
+    def create(cls, path: str, capacity: int = 1024, columns=COLUMNS):
+        capacity = max(int(capacity), 1)
+        with open(path, "wb") as f:
+            _write_header(f, 0, capacity, columns)
+            f.truncate(HEADER_SIZE + capacity * 8 * len(columns))
+        return cls(path)
+
+    def _offset(self, name: str):
+        for index, (column, _) in enumerate(self.columns):
+            if column == name:
+                return HEADER_SIZE + index * self.capacity * 8
+        raise KeyError(f"Coluna desconhecida: {name}")
+
+    def _dtype(self, name: str):
+        return dict(self.columns)[name]
+
+    def column(self, name: str):
+        """Coluna inteira como memmap somente leitura (sem cópia)."""
+        data = self._maps.get(name)
+        if data is None:
+            data = np.memmap(self.path, dtype=self._dtype(name), mode="r",
+                             offset=self._offset(name), shape=(self.capacity,))
+            self._maps[name] = data
+        return data[:self.rows]
+
+    def tail(self, name: str, n: int):
+        return self.column(name)[max(0, self.rows - n):]
+
+    def dates(self):
+        return self.column("date").astype("datetime64[D]")
+
+    def _grow(self, needed: int):
+        # Regrava com o dobro da capacidade e troca o arquivo de forma atômica
+        capacity = max(needed, 2 * self.capacity)
+        tmp_path = self.path + ".tmp"
+        new = PriceStore.create(tmp_path, capacity, self.columns)
+        with open(tmp_path, "r+b") as f:
+            for name, _ in self.columns:
+                f.seek(new._offset(name))
+                f.write(np.ascontiguousarray(self.column(name)).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        new.rows = self.rows
+        new._commit_rows(self.rows)
+        os.replace(tmp_path, self.path)
+        self.capacity = capacity
+        self._maps = {}
+
+    def _commit_rows(self, rows: int):
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, struct.pack("<Q", rows), 8)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.rows = rows
+
+    def append(self, data: dict):
+        """
+        Anexa linhas: `data` mapeia nome da coluna para array (todas do mesmo
+        tamanho). Colunas ausentes ficam NaN (float) ou 0 (int).
+        """
+        count = len(next(iter(data.values())))
+        if count == 0:
+            return self.rows
+
+        with open(self.path, "r+b") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.rows, self.capacity, _ = _read_header(lock)
+                self._maps = {}
+                if "date" in data and self.rows and np.min(data["date"]) < self.column("date")[-1]:
+                    raise ValueError("Candles anteriores ao último já gravado: o store só aceita anexar no fim")
+                if self.rows + count > self.capacity:
+                    self._grow(self.rows + count)
+
+                with open(self.path, "r+b") as f:
+                    for name, dtype in self.columns:
+                        values = data.get(name)
+                        if values is None:
+                            values = np.full(count, np.nan if dtype.endswith("f8") else 0, dtype=dtype)
+                        values = np.asarray(values, dtype=dtype)
+                        if len(values) != count:
+                            raise ValueError(f"Coluna {name} com {len(values)} linhas, esperado {count}")
+                        f.seek(self._offset(name) + self.rows * 8)
+                        f.write(values.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                # Só depois dos dados: leitores passam a enxergar as novas linhas
+                self._commit_rows(self.rows + count)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        self._maps = {}
+        return self.rows
+
+
+def frame_to_columns(df):
+    import pandas as pd
+
+    df = df.rename(columns=CSV_COLUMNS)
+    df = df[pd.to_numeric(df["close"], errors="coerce").notna()]
+    data = {"date": pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[D]").astype("<i8")}
+    for name, dtype in COLUMNS[1:]:
+        if name in df.columns:
+            values = pd.to_numeric(df[name], errors="coerce")
+            if dtype.endswith("i8"):
+                values = values.fillna(0)
+            data[name] = values.to_numpy(dtype=dtype)
+    return data
+
+
+def convert_csv(csv_path: str, store_path: str, chunk_rows: int = CONVERT_CHUNK_ROWS):
+    """Converte o CSV em blocos, sem carregar o arquivo inteiro na memória."""
+    import pandas as pd
+
+    store = PriceStore.create(store_path)
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        store.append(frame_to_columns(chunk))
+    return store
+
+
+def append_csv(store_path: str, csv_path: str):
+    import pandas as pd
+
+    store = PriceStore(store_path)
+    return store.append(frame_to_columns(pd.read_csv(csv_path)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert")
+    convert.add_argument("csv")
+    convert.add_argument("store")
+    append = commands.add_parser("append")
+    append.add_argument("store")
+    append.add_argument("csv")
+    info = commands.add_parser("info")
+    info.add_argument("store")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        store = convert_csv(args.csv, args.store)
+        print(f"{store.rows} linhas gravadas em {args.store}")
+    elif args.command == "append":
+        print(f"{append_csv(args.store, args.csv)} linhas no total")
+    else:
+        store = PriceStore(args.store)
+        dates = store.dates()
+        print(f"{store.rows} linhas (capacidade {store.capacity}), colunas: {[name for name, _ in store.columns]}")
+        if store.rows:
+            print(f"de {dates[0]} a {dates[-1]}, último close {store.column('close')[-1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Laço autoregressivo de previsão sem alocações por passo.
+
+A janela de entrada fica num buffer circular pré-alocado (espelhado em 2 * time_steps
+posições, para que a janela atual seja sempre uma fatia contígua) e cada passo chama
+uma função compilada do modelo em vez de `model.predict`.
+
+Tolerância: no modo padrão (janela completa a cada passo) o resultado é o mesmo
+cálculo de `model.predict`, em float32; a diferença para a implementação antiga
+fica abaixo de 1e-5 no valor normalizado. O modo `stateful=True` carrega o estado
+recorrente de um passo para o outro (O(1) por dia), mas o estado passa a lembrar
+de mais de 60 dias, então é uma aproximação: a diferença cresce com o horizonte
+(medido com os modelos atuais em 90 dias: até 1e-4 no valor normalizado).
+"""
+import threading
+
+import numpy as np
+
+from utils.numpy_engine import NumpyModel, NumpyStatefulStep, NumpyStep
+
+TIME_STEPS = 60
+
+
+class WindowRing:
+    """Buffer circular de janelas, uma linha por série do lote."""
+
+    def __init__(self, windows):
+        windows = np.asarray(windows, dtype=np.float32).reshape(len(windows), -1)
+        self.batch_size, self.time_steps = windows.shape
+        self._buffer = np.empty((self.batch_size, 2 * self.time_steps), dtype=np.float32)
+        self._buffer[:, :self.time_steps] = windows
+        self._buffer[:, self.time_steps:] = windows
+        self._pos = 0
+
+    def window(self):
+        return self._buffer[:, self._pos:self._pos + self.time_steps, np.newaxis]
+
+    def push(self, values):
+        # Escreve o novo valor nas duas cópias e avança o início da janela
+        self._buffer[:, self._pos] = values
+        self._buffer[:, self._pos + self.time_steps] = values
+        self._pos += 1
+        if self._pos == self.time_steps:
+            self._pos = 0
+
+
+class CompiledStep:
+    """Passo único do modelo compilado com tf.function, para qualquer tamanho de lote."""
+
+    def __init__(self, model, time_steps: int = TIME_STEPS):
+        import tensorflow as tf
+
+        self.model = model
+        self.time_steps = time_steps
+        self._fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, time_steps, 1], tf.float32)],
+        )
+
+    def __call__(self, windows):
+        return self._fn(np.ascontiguousarray(windows)).numpy()[:, 0]
+
+
+class StatefulStep:
+    """
+    Passo que alimenta as células recorrentes com um único valor, carregando o
+    estado (h, c) adiante. Suporta modelos Sequential de LSTM/GRU + Dropout + Dense.
+    """
+
+    def __init__(self, model, time_steps: int = TIME_STEPS):
+        import keras
+        import tensorflow as tf
+
+        self.time_steps = time_steps
+        self._layers = [layer for layer in model.layers if not isinstance(layer, keras.layers.Dropout)]
+        self._cells = [layer.cell for layer in self._layers if hasattr(layer, "cell")]
+        if not self._cells:
+            raise ValueError("Modelo não possui camadas recorrentes.")
+
+        def step(x, states):
+            outputs = x
+            new_states = []
+            index = 0
+            for layer in self._layers:
+                if hasattr(layer, "cell"):
+                    outputs, state = layer.cell(outputs, states[index], training=False)
+                    new_states.append(state)
+                    index += 1
+                else:
+                    outputs = layer(outputs, training=False)
+            return outputs, new_states
+
+        def prime(windows, states):
+            outputs = None
+            for t in range(time_steps):
+                outputs, states = step(windows[:, t:t + 1], states)
+            return outputs, states
+
+        self._step = tf.function(step, reduce_retracing=True)
+        self._prime = tf.function(prime, reduce_retracing=True)
+
+    def initial_states(self, batch_size: int):
+        return [cell.get_initial_state(batch_size=batch_size) for cell in self._cells]
+
+    def prime(self, windows):
+        windows = np.ascontiguousarray(windows, dtype=np.float32)
+        outputs, states = self._prime(windows, self.initial_states(len(windows)))
+        return outputs.numpy()[:, 0], states
+
+    def __call__(self, values, states):
+        outputs, states = self._step(values.reshape(-1, 1), states)
+        return outputs.numpy()[:, 0], states
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def _get_compiled(model, kind, factory):
+    key = (id(model), kind)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        with _compiled_lock:
+            compiled = _compiled.get(key)
+            if compiled is None:
+                compiled = (model, factory(model))
+                _compiled[key] = compiled
+    return compiled[1]
+
+
+def get_step(model):
+    # Modelos do engine NumPy não passam pelo TensorFlow
+    if isinstance(model, NumpyModel):
+        return _get_compiled(model, "step", NumpyStep)
+    return _get_compiled(model, "step", CompiledStep)
+
+
+def get_stateful_step(model):
+    if isinstance(model, NumpyModel):
+        return _get_compiled(model, "stateful", NumpyStatefulStep)
+    return _get_compiled(model, "stateful", StatefulStep)
+
+
+def release_model(model):
+    # Chamado quando o registro troca o modelo, para liberar as funções compiladas
+    with _compiled_lock:
+        for kind in ("step", "stateful"):
+            _compiled.pop((id(model), kind), None)
+
+
+def rolling_forecast_batch(model, windows, num_days: int, stateful: bool = False, on_step=None):
+    """
+    Previsão autoregressiva de `num_days` passos para um lote de janelas normalizadas.
+    `windows` tem shape (batch, time_steps) ou (batch, time_steps, 1); o retorno
+    tem shape (batch, num_days), ainda normalizado.
+    """
+    windows = np.asarray(windows, dtype=np.float32)
+    windows = windows.reshape(len(windows), -1)
+    predictions = np.empty((len(windows), num_days), dtype=np.float32)
+    if num_days <= 0:
+        return predictions
+
+    if stateful:
+        step = get_stateful_step(model)
+        values, states = step.prime(windows)
+        for day in range(num_days):
+            if day:
+                values, states = step(values, states)
+            predictions[:, day] = values
+            if on_step is not None:
+                on_step(day, values)
+        return predictions
+
+    step = get_step(model)
+    ring = WindowRing(windows)
+    for day in range(num_days):
+        values = step(ring.window())
+        predictions[:, day] = values
+        ring.push(values)
+        if on_step is not None:
+            on_step(day, values)
+    return predictions
+
+
+def rolling_forecast(model, window, num_days: int, stateful: bool = False, on_step=None):
+    """Mesmo que rolling_forecast_batch, para uma única janela; retorna shape (num_days,)."""
+    window = np.asarray(window, dtype=np.float32).reshape(1, -1)
+    return rolling_forecast_batch(model, window, num_days, stateful=stateful, on_step=on_step)[0]
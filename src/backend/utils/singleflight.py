@@ -0,0 +1,38 @@
+import asyncio
+
+from utils.metrics import counter
+
+
+class SingleFlight:
+    """
+    Junta chamadas idênticas em andamento: a primeira executa e as duplicadas
+    aguardam o mesmo resultado (ou a mesma exceção). A execução roda numa task
+    própria protegida por asyncio.shield, então cancelar um dos chamadores,
+    inclusive o primeiro, não cancela o cálculo compartilhado.
+    """
+
+    def __init__(self, name: str):
+        self._in_flight = {}
+        self.executed = counter(f"{name}_executed")
+        self.coalesced = counter(f"{name}_coalesced")
+
+    def _done(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marca a exceção como consumida caso todos os chamadores tenham desistido
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key, fn, *args, **kwargs):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.executed.inc()
+        else:
+            self.coalesced.inc()
+        return await asyncio.shield(task)
+
+    def in_flight(self):
+        return len(self._in_flight)
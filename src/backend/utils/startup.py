@@ -0,0 +1,78 @@
+"""
+Medições de boot: tempo de import por módulo e memória do processo.
+
+A memória vem de /proc/<pid>/smaps_rollup: além do RSS, o PSS divide as páginas
+compartilhadas entre os processos que as usam, então com workers criados por fork
+(serve.py) o PSS mostra quanto de fato é de cada worker. Fora do Linux os valores
+ficam vazios.
+"""
+import importlib
+import os
+import sys
+import time
+
+from utils.metrics import gauge
+
+_ROLLUP_FIELDS = {
+    "Rss": "rss_mib",
+    "Pss": "pss_mib",
+    "Shared_Clean": "shared_clean_mib",
+    "Shared_Dirty": "shared_dirty_mib",
+    "Private_Clean": "private_clean_mib",
+    "Private_Dirty": "private_dirty_mib",
+}
+
+
+def memory_info(pid="self"):
+    info = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in _ROLLUP_FIELDS:
+                    info[_ROLLUP_FIELDS[name]] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    if info:
+        info["shared_mib"] = round(info.get("shared_clean_mib", 0) + info.get("shared_dirty_mib", 0), 1)
+    return info
+
+
+def timed_imports(modules):
+    """
+    Importa os módulos em ordem e devolve [(módulo, ms)]. Dependências já
+    carregadas por um módulo anterior não contam de novo; módulos ausentes ficam
+    com None.
+    """
+    timings = []
+    for name in modules:
+        if name in sys.modules:
+            timings.append((name, 0.0))
+            continue
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            timings.append((name, None))
+            continue
+        timings.append((name, (time.perf_counter() - start) * 1000))
+    return timings
+
+
+def format_imports(timings):
+    return ", ".join(f"{name} {'ausente' if ms is None else f'{ms:.0f} ms'}" for name, ms in timings)
+
+
+def format_memory(info):
+    if not info:
+        return "memória indisponível"
+    return (f"RSS {info['rss_mib']:.1f} MiB, PSS {info['pss_mib']:.1f} MiB, "
+            f"compartilhada {info['shared_mib']:.1f} MiB, privada suja {info['private_dirty_mib']:.1f} MiB")
+
+
+def boot_report(label: str = "worker"):
+    print(f"[{label} {os.getpid()}] {format_memory(memory_info())}", flush=True)
+
+
+gauge("process_rss_mib", lambda: memory_info().get("rss_mib"))
+gauge("process_pss_mib", lambda: memory_info().get("pss_mib"))
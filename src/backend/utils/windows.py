@@ -0,0 +1,44 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TIME_STEPS = 60
+
+
+def _as_series(data):
+    data = np.asarray(data)
+    if data.ndim == 2:
+        # (n, 1) vira (n,) sem cópia, apenas mudando os strides
+        return data[:, 0]
+    if data.ndim != 1:
+        raise ValueError(f"Série deve ter 1 ou 2 dimensões, recebido {data.ndim}.")
+    return data
+
+
+def sliding_windows(data, time_steps: int = TIME_STEPS, stride: int = 1):
+    """
+    Todas as janelas de `time_steps` valores da série, com passo `stride`.
+    Retorna uma view somente leitura de shape (n, time_steps, 1), sem copiar dados.
+    """
+    series = _as_series(data)
+    if time_steps < 1 or stride < 1:
+        raise ValueError("time_steps e stride devem ser positivos.")
+    if len(series) < time_steps:
+        raise ValueError(f"Série deve conter pelo menos {time_steps} valores.")
+
+    windows = sliding_window_view(series, time_steps)[::stride]
+    return windows[..., np.newaxis]
+
+
+def create_sequences(data, time_steps: int = TIME_STEPS, stride: int = 1):
+    """
+    Pares (X, y) para treino: X[i] é a janela que termina antes de y[i].
+    X tem shape (n, time_steps, 1) e y shape (n,), ambos views somente leitura.
+    """
+    series = _as_series(data)
+    if len(series) <= time_steps:
+        raise ValueError(f"Série deve conter mais de {time_steps} valores.")
+
+    X = sliding_windows(series[:-1], time_steps, stride)
+    y = series[time_steps::stride].view()
+    y.flags.writeable = False
+    return X, y
@@ -1,6 +1,6 @@
 CREATE TABLE users (
   id serial PRIMARY KEY,
-  username text,
+  username text UNIQUE,
   password text
 );
 
@@ -11,7 +11,8 @@ CREATE TABLE predict (
     forecast bool,
     forecast_result json,
     model text,
-    user_id integer REFERENCES users (id)
+    user_id integer REFERENCES users (id),
+    created_at timestamptz NOT NULL DEFAULT now()
 );
 
 CREATE TABLE logs (
@@ -19,5 +20,8 @@ CREATE TABLE logs (
     date text,
     username_log text,
     action text,
-    user_id integer REFERENCES users (id)
-);  
\ No newline at end of file
+    user_id integer REFERENCES users (id),
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Índices, particionamento mensal de logs e retenção: aplique os arquivos de migrations/ em ordem.
@@ -0,0 +1,146 @@
+-- Migração 001: created_at real, índices para os acessos dos routers e logs particionados por mês.
+-- Idempotente: pode rodar tanto num banco antigo (date em texto, logs comum) quanto num banco
+-- criado pelo database.sql atual.
+
+BEGIN;
+
+-- Login faz eq("username", ...): índice único (falha se já houver usernames duplicados,
+-- que precisam ser resolvidos antes)
+CREATE UNIQUE INDEX IF NOT EXISTS users_username_key ON users (username);
+
+-- predict: created_at preenchido a partir do texto 'DD/MM/YYYY_HHhMI' gravado em horário de São Paulo
+ALTER TABLE predict ADD COLUMN IF NOT EXISTS created_at timestamptz;
+
+UPDATE predict
+SET created_at = to_timestamp(date, 'DD/MM/YYYY_HH24"h"MI')::timestamp AT TIME ZONE 'America/Sao_Paulo'
+WHERE created_at IS NULL AND date ~ '^\d{2}/\d{2}/\d{4}_\d{2}h\d{2}$';
+
+UPDATE predict SET created_at = now() WHERE created_at IS NULL;
+
+ALTER TABLE predict ALTER COLUMN created_at SET DEFAULT now();
+ALTER TABLE predict ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS predict_user_id_created_at_idx ON predict (user_id, created_at);
+CREATE INDEX IF NOT EXISTS predict_created_at_idx ON predict (created_at);
+
+-- logs: mesma coluna, depois a tabela é recriada particionada por mês de created_at
+ALTER TABLE logs ADD COLUMN IF NOT EXISTS created_at timestamptz;
+
+UPDATE logs
+SET created_at = to_timestamp(date, 'DD/MM/YYYY_HH24"h"MI')::timestamp AT TIME ZONE 'America/Sao_Paulo'
+WHERE created_at IS NULL AND date ~ '^\d{2}/\d{2}/\d{4}_\d{2}h\d{2}$';
+
+UPDATE logs SET created_at = now() WHERE created_at IS NULL;
+
+-- Linhas compactadas: contagem por dia/usuário/ação das partições removidas pela retenção
+CREATE TABLE IF NOT EXISTS logs_daily (
+    day date NOT NULL,
+    user_id integer,
+    action text NOT NULL,
+    total integer NOT NULL,
+    UNIQUE NULLS NOT DISTINCT (day, user_id, action)
+);
+
+CREATE OR REPLACE FUNCTION create_logs_partition(month date)
+RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+    start_at date := date_trunc('month', month)::date;
+    partition_name text := format('logs_%s', to_char(start_at, 'YYYY_MM'));
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF logs FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_at, (start_at + interval '1 month')::date
+    );
+END;
+$$;
+
+DO $$
+DECLARE
+    month date;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'logs'::regclass) THEN
+        ALTER TABLE logs RENAME TO logs_unpartitioned;
+        -- O nome do índice da PK antiga ficaria em conflito com o da nova tabela
+        ALTER INDEX IF EXISTS logs_pkey RENAME TO logs_unpartitioned_pkey;
+        ALTER SEQUENCE logs_id_seq OWNED BY NONE;
+
+        -- A chave primária de uma tabela particionada precisa incluir a coluna de partição
+        CREATE TABLE logs (
+            id integer NOT NULL DEFAULT nextval('logs_id_seq'),
+            date text,
+            username_log text,
+            action text,
+            user_id integer REFERENCES users (id),
+            created_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+
+        ALTER SEQUENCE logs_id_seq OWNED BY logs.id;
+
+        CREATE TABLE IF NOT EXISTS logs_default PARTITION OF logs DEFAULT;
+
+        FOR month IN
+            SELECT DISTINCT date_trunc('month', created_at)::date FROM logs_unpartitioned
+        LOOP
+            PERFORM create_logs_partition(month);
+        END LOOP;
+
+        INSERT INTO logs (id, date, username_log, action, user_id, created_at)
+        SELECT id, date, username_log, action, user_id, created_at FROM logs_unpartitioned;
+
+        DROP TABLE logs_unpartitioned;
+    END IF;
+
+    -- Partições do mês atual e dos próximos três
+    FOR month IN
+        SELECT generate_series(date_trunc('month', now()), date_trunc('month', now()) + interval '3 months', interval '1 month')::date
+    LOOP
+        PERFORM create_logs_partition(month);
+    END LOOP;
+END;
+$$;
+
+-- Índices na tabela particionada valem para todas as partições
+CREATE INDEX IF NOT EXISTS logs_user_id_created_at_idx ON logs (user_id, created_at);
+CREATE INDEX IF NOT EXISTS logs_created_at_idx ON logs (created_at);
+
+-- Retenção: compacta em logs_daily e remove partições mais antigas que keep_months;
+-- também garante as partições dos próximos meses
+CREATE OR REPLACE FUNCTION logs_maintenance(keep_months integer DEFAULT 12)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    cutoff date := (date_trunc('month', now()) - make_interval(months => keep_months))::date;
+    child record;
+    upper_bound date;
+    dropped integer := 0;
+BEGIN
+    FOR child IN
+        SELECT part.relname AS name, pg_get_expr(part.relpartbound, part.oid) AS bound
+        FROM pg_inherits
+        JOIN pg_class part ON part.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'logs'::regclass AND part.relname <> 'logs_default'
+    LOOP
+        upper_bound := substring(child.bound FROM 'TO \(''([0-9-]+)')::date;
+        IF upper_bound <= cutoff THEN
+            EXECUTE format(
+                'INSERT INTO logs_daily (day, user_id, action, total)
+                 SELECT created_at::date, user_id, action, count(*) FROM %I GROUP BY 1, 2, 3
+                 ON CONFLICT (day, user_id, action) DO UPDATE SET total = logs_daily.total + EXCLUDED.total',
+                child.name
+            );
+            EXECUTE format('DROP TABLE %I', child.name);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+
+    PERFORM create_logs_partition((date_trunc('month', now()) + make_interval(months => m))::date)
+    FROM generate_series(0, 3) AS m;
+
+    RETURN dropped;
+END;
+$$;
+
+COMMIT;
+
+-- Agendamento mensal no Supabase (extensão pg_cron):
+-- SELECT cron.schedule('logs-maintenance', '0 3 1 * *', $$SELECT logs_maintenance(12)$$);
@@ -0,0 +1,14 @@
+-- Migração 002: índices (user_id, id) para a paginação por keyset em id.
+-- /list/?user_id= faz WHERE user_id = ... ORDER BY id DESC LIMIT n: com (user_id, id) o
+-- Postgres lê só as n linhas do usuário, já na ordem, sem ordenar depois.
+-- Em logs, o filtro de created_at ainda elimina as partições fora do intervalo.
+-- Idempotente.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS predict_user_id_id_idx ON predict (user_id, id);
+
+-- Índice na tabela particionada vale para todas as partições
+CREATE INDEX IF NOT EXISTS logs_user_id_id_idx ON logs (user_id, id);
+
+COMMIT;
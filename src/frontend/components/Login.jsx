@@ -29,6 +29,8 @@ const Login = () => {
         toast.success('Login bem-sucedido!');
         console.log('Resposta da API:', data); 
         const userId = data.user?.id; 
+        localStorage.setItem('access_token', data.access_token);
+        localStorage.setItem('refresh_token', data.refresh_token);
         if (userId) {
           router.push(`/home?id=${userId}`);
         } else {
@@ -17,7 +17,7 @@ const Logs = () => {
     const fetchLogs = async () => {
       setLoading(true);
       try {
-        const response = await fetch('http://localhost:8000/logs/list/');
+        const response = await fetch('http://localhost:8000/logs/list/?limit=500');
         const data = await response.json();
         if (response.ok) {
           setLogs(data.logs);
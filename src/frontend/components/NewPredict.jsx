@@ -8,22 +8,62 @@ import { useRouter } from 'next/router';
 const NewPredict = () => {
   const router = useRouter();
   const [latestPrediction, setLatestPrediction] = useState(null);
+  const [currentPredictions, setCurrentPredictions] = useState([]); // Página atual vinda do backend
   const [selectedModel, setSelectedModel] = useState('lstm');
   const [isSubmitting, setIsSubmitting] = useState(false);
   const [days, setDays] = useState('');
   const [currentPage, setCurrentPage] = useState(1); // Estado para a página atual
   const [username, setUsername] = useState(''); // Estado para armazenar o nome do usuário
   const [userid, setUserId] = useState('')
+  const [progress, setProgress] = useState(null); // Dias já previstos pelo job em andamento
   const rowsPerPage = 7; // Limite de linhas por página
 
   // Captura o id do usuário da URL
   const { id } = router.query;
   const paramValue = id || ''; // Se não houver ID, valor padrão vazio
 
+  const fetchMe = (token) =>
+    axios.get('http://localhost:8000/users/me', { headers: { Authorization: `Bearer ${token}` } });
+
+  // Com token, /users/me responde só com as claims, sem consultar o banco.
+  // Access token expirado (401): renova uma vez com o refresh token e tenta de novo.
+  // Se a renovação falhar, descarta os tokens e devolve null para seguir pelo id da URL.
+  const fetchCurrentUser = async () => {
+    const token = localStorage.getItem('access_token');
+    if (!token) {
+      return null;
+    }
+    try {
+      return await fetchMe(token);
+    } catch (error) {
+      if (!error.response || error.response.status !== 401) {
+        return null;
+      }
+    }
+    try {
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (!refreshToken) {
+        throw new Error('Refresh token ausente');
+      }
+      const { data } = await axios.post('http://localhost:8000/users/refresh/', { refresh_token: refreshToken });
+      localStorage.setItem('access_token', data.access_token);
+      localStorage.setItem('refresh_token', data.refresh_token);
+      return await fetchMe(data.access_token);
+    } catch (error) {
+      console.error("Sessão expirada:", error.response ? error.response.data : error.message);
+      localStorage.removeItem('access_token');
+      localStorage.removeItem('refresh_token');
+      return null;
+    }
+  };
+
   const handleUser = async (paramValue) => {
     try {
-      const url = `http://localhost:8000/users/get_by_id/${paramValue}`;
-      const response = await axios.get(url);
+      const response = (await fetchCurrentUser())
+        || await axios.get(`http://localhost:8000/users/get_by_id/${paramValue}`);
+      if (response.data && response.data.user && !Array.isArray(response.data.user)) {
+        response.data.user = [response.data.user];
+      }
   
       // Inspeciona toda a resposta para verificar a estrutura
       console.log("Resposta completa da API:", response.data);
@@ -43,41 +83,68 @@ const NewPredict = () => {
   };
   
   
+  // Acompanha o job pelo SSE até ele terminar, atualizando o progresso a cada dia previsto.
+  // EventSource não manda headers: o token vai na query para o backend reconhecer o dono do job
+  const followJob = (jobId, total, token) => new Promise((resolve, reject) => {
+    const query = token ? `?access_token=${encodeURIComponent(token)}` : '';
+    const source = new EventSource(`http://localhost:8000/predicts/jobs/${jobId}/events${query}`);
+    source.addEventListener('point', (event) => {
+      setProgress({ done: JSON.parse(event.data).day, total });
+    });
+    source.addEventListener('status', (event) => {
+      source.close();
+      const job = JSON.parse(event.data);
+      job.status === 'done' ? resolve(job) : reject(new Error(job.error || job.status));
+    });
+    source.onerror = () => {
+      source.close();
+      reject(new Error('Conexão com o job perdida'));
+    };
+  });
+
   const handleNewPrediction = async () => {
     setIsSubmitting(true);
+    const body = {
+      username: username,  // Utiliza o username do estado
+      user_id: userid, // Envia o ID do usuário capturado da URL
+      forecast: true,
+      forecast_result: "string",
+      days: parseInt(days)
+    };
+    // Com token, o limite de previsões do backend é contado por usuário e não por IP
+    const token = localStorage.getItem('access_token');
+    const authHeaders = token ? { Authorization: `Bearer ${token}` } : {};
     try {
-      const url = `http://localhost:8000/predicts/predict/${selectedModel}`;
-      const response = await axios.post(url, {
-        username: username,  // Utiliza o username do estado
-        user_id: userid, // Envia o ID do usuário capturado da URL
-        forecast: true,
-        forecast_result: "string",
-        days: parseInt(days)
-      }, {
-        headers: {
-          'Content-Type': 'application/json'
-        }
-      });
-
-      if (response.status === 200) {
-        toast.success('Nova previsão criada com sucesso!');
-        fetchLatestPrediction();
+      if (selectedModel === 'ensemble') {
+        await axios.post('http://localhost:8000/predicts/predict/ensemble', body, {
+          headers: {
+            'Content-Type': 'application/json',
+            ...authHeaders
+          }
+        });
+      } else {
+        // Job assíncrono: a requisição volta na hora e o progresso chega por SSE
+        const response = await axios.post(`http://localhost:8000/predicts/jobs/${selectedModel}`, body, { headers: authHeaders });
+        setProgress({ done: 0, total: body.days });
+        await followJob(response.data.job_id, body.days, token);
       }
+      toast.success('Nova previsão criada com sucesso!');
+      fetchLatestPrediction();
     } catch (error) {
       console.error('Erro ao criar nova previsão:', error);
       toast.error('Erro ao criar nova previsão.');
     } finally {
       setIsSubmitting(false);
+      setProgress(null);
     }
   };
 
   // Função para buscar a última previsão
   const fetchLatestPrediction = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/predicts/list');
-      if (response.data && response.data.predict && response.data.predict.length > 0) {
-        const sortedPredictions = response.data.predict.sort((a, b) => b.id - a.id);
-        setLatestPrediction(sortedPredictions[0]);
+      const response = await axios.get('http://localhost:8000/predicts/latest?fields=id,username_predict,model,date,forecast_result');
+      if (response.data && response.data.predict) {
+        setLatestPrediction(response.data.predict);
       }
     } catch (error) {
       console.error('Erro ao buscar última previsão:', error);
@@ -107,15 +174,25 @@ const NewPredict = () => {
     }
   };
 
-  // Paginação: calcular previsões atuais para exibir
-  const indexOfLastPrediction = currentPage * rowsPerPage;
-  const indexOfFirstPrediction = indexOfLastPrediction - rowsPerPage;
-  const currentPredictions = latestPrediction ? latestPrediction.forecast_result.slice(indexOfFirstPrediction, indexOfLastPrediction) : [];
+  // Paginação no backend: busca só os pontos da página atual
+  useEffect(() => {
+    if (!latestPrediction) {
+      return;
+    }
+    const offset = (currentPage - 1) * rowsPerPage;
+    axios
+      .get(`http://localhost:8000/predicts/get/${latestPrediction.id}?expand=true&offset=${offset}&limit=${rowsPerPage}`)
+      .then((response) => setCurrentPredictions(response.data.predict[0].forecast_result))
+      .catch((error) => console.error('Erro ao buscar página da previsão:', error));
+  }, [latestPrediction, currentPage]);
 
   // Mudar página
   const paginate = (pageNumber) => setCurrentPage(pageNumber);
 
-  const totalPages = latestPrediction ? Math.ceil(latestPrediction.forecast_result.length / rowsPerPage) : 0;
+  const totalPages = latestPrediction ? Math.ceil(latestPrediction.forecast_total / rowsPerPage) : 0;
+
+  // Previsões de ensemble trazem a faixa entre os modelos em cada ponto
+  const hasBands = currentPredictions.length > 0 && currentPredictions[0].lower !== undefined;
 
   return (
     <div>
@@ -133,7 +210,7 @@ const NewPredict = () => {
         )}
 
         {/* Tabela de previsão */}
-        {latestPrediction && latestPrediction.forecast_result.length > 0 ? (
+        {latestPrediction && latestPrediction.forecast_total > 0 ? (
           <div className="bg-gray-800 p-4 rounded-lg shadow-lg w-full max-w-md mt-6">
             <h2 className="text-xl font-medium mb-4">Resultado da Previsão:</h2>
             <table className="table-auto w-full text-left text-white">
@@ -141,6 +218,7 @@ const NewPredict = () => {
                 <tr>
                   <th className="px-4 py-2">Data</th>
                   <th className="px-4 py-2">Valor em USD ($)</th>
+                  {hasBands && <th className="px-4 py-2">Faixa (mín - máx)</th>}
                 </tr>
               </thead>
               <tbody>
@@ -148,6 +226,9 @@ const NewPredict = () => {
                   <tr key={index} className="bg-gray-700">
                     <td className="border px-4 py-2">{formatDate(item.date)}</td>
                     <td className="border px-4 py-2">{item.predicted_value.toFixed(2)}</td>
+                    {hasBands && (
+                      <td className="border px-4 py-2">{item.lower.toFixed(2)} - {item.upper.toFixed(2)}</td>
+                    )}
                   </tr>
                 ))}
               </tbody>
@@ -185,6 +266,7 @@ const NewPredict = () => {
           >
             <option value="lstm">LSTM</option>
             <option value="gru">GRU</option>
+            <option value="ensemble">Ensemble (LSTM + GRU)</option>
           </select>
 
           <label htmlFor="inputDays" className="block text-sm font-medium text-gray-300 mt-4 mb-2">
@@ -207,6 +289,15 @@ const NewPredict = () => {
         >
           {isSubmitting ? 'Enviando...' : 'Criar Nova Previsão'}
         </button>
+
+        {progress && (
+          <div className="w-full max-w-md">
+            <p className="text-sm text-gray-300 mb-1">Previstos {progress.done} de {progress.total} dias</p>
+            <div className="w-full bg-gray-700 rounded h-2">
+              <div className="bg-blue-500 h-2 rounded" style={{ width: `${(100 * progress.done) / progress.total}%` }} />
+            </div>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -33,10 +33,9 @@ const Pricing = () => {
 
   const fetchLatestPrediction = async () => {
     try {
-      const response = await axios.get('http://localhost:8000/predicts/list');
-      if (response.data && response.data.predict && response.data.predict.length > 0) {
-        const sortedPredictions = response.data.predict.sort((a, b) => b.id - a.id);
-        setLatestPrediction(sortedPredictions[0]);
+      const response = await axios.get('http://localhost:8000/predicts/latest?expand=true&limit=1');
+      if (response.data && response.data.predict) {
+        setLatestPrediction(response.data.predict);
       }
     } catch (error) {
       console.error('Erro ao buscar última previsão:', error);